@@ -1,14 +1,17 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, redirect
+from flask import Flask, Blueprint, Response, current_app, render_template, request, jsonify, send_from_directory, redirect
 import os
-import uuid
-import threading
 import logging
-import traceback
-import json
-import time
+import threading
+import uuid
 
 # Import configuration
-from config import UPLOAD_FOLDER, MAX_CONTENT_LENGTH, SEGMENT_DURATION, OVERLAP_DURATION
+from config import (UPLOAD_FOLDER, MAX_CONTENT_LENGTH, SEGMENT_CONCURRENCY, STREAM_COPY_SEGMENTS,
+                    SCRATCH_FOLDER, SCRATCH_QUOTA_BYTES, STALE_FILE_MAX_AGE, MAX_CONCURRENT_JOBS,
+                    MAX_QUEUED_JOBS, MAX_QUEUED_JOBS_PER_KEY, MAX_RETAINED_JOBS, QUEUE_RETRY_AFTER,
+                    JOB_BACKEND, JOB_DB_PATH, PROBE_API_ON_JOB, QUOTA_UNITS_PER_AUDIO_MINUTE,
+                    AUDIO_DEDUP, FINGERPRINT_DB_PATH, FINGERPRINT_MAX_AGE, RESPONSE_CACHE_ENTRIES,
+                    API_KEY_POOL, API_KEY_POOL_FILE, API_KEY_POOL_CONCURRENCY, KEY_SIDELINE_SECONDS,
+                    KEY_AUTH_SIDELINE_SECONDS)
 
 # Track import errors
 import_errors = []
@@ -16,6 +19,7 @@ import_errors = []
 # Import modules with improved error handling
 try:
     from modules.utils import save_uploaded_file, clean_up_file
+    from modules.workspace import sweep_stale_files
     utils_imported = True
 except ImportError as e:
     error_msg = f"Error importing utils module: {e}"
@@ -24,9 +28,9 @@ except ImportError as e:
     print(f"Error: Could not import utils module. Make sure all requirements are installed.")
     utils_imported = False
 
-# Import the FFmpeg-based audio module
+# Import the FFmpeg-based audio module; the pipeline uses it, this import only reports a broken install on the index page
 try:
-    from modules.audio import split_audio
+    from modules.audio import split_audio  # noqa: F401
     audio_imported = True
     print("Successfully imported FFmpeg-based audio module")
 except ImportError as e:
@@ -37,8 +41,13 @@ except ImportError as e:
     audio_imported = False
 
 try:
-    from modules.transcription import transcribe_segment_with_requests, process_transcript_with_labels
-    from modules.api import log_elevenlabs_endpoints, check_scribe_access, log_api_capabilities
+    from modules.jobs import QueueFullError, create_job_backend, hash_api_key, new_job
+    from modules.api import QuotaExceededError, capabilities, check_quota
+    from modules.metrics import bind_job, metrics, span
+    from modules.export import EXPORT_FORMATS
+    from modules.key_pool import POOL_API_KEY, get_key_pool
+    from modules.responses import ResponseCache, field_version
+    from modules.transcript_index import search_index, seek
     api_imported = True
 except ImportError as e:
     error_msg = f"Error importing transcription/API modules: {e}"
@@ -47,125 +56,141 @@ except ImportError as e:
     print(f"Error: Could not import transcription or API modules. Make sure all requirements are installed.")
     api_imported = False
 
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
-
-# Create uploads folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# Create a static directory if it doesn't exist
-os.makedirs('static/img', exist_ok=True)
-
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# Global variables to track transcription progress
-current_job = {
-    'id': None,
-    'progress': 0,
-    'status': 'Not started',
-    'complete': False,
-    'transcript': [],
-    'processing_progress': 0,
-    'processing_complete': False
-}
-
-def process_audio(file_path, api_key, enable_diarization=True, num_speakers='', model_id='scribe_v1'):
-    """Process audio file: split into segments and transcribe."""
-    global current_job
+# Routes are registered on a blueprint so create_app can build independent app instances
+bp = Blueprint('main', __name__)
+
+def create_app(test_config=None):
+    """Create and configure the Flask application."""
+    app = Flask(__name__)
+    app.config.from_mapping(
+        UPLOAD_FOLDER=UPLOAD_FOLDER,
+        MAX_CONTENT_LENGTH=MAX_CONTENT_LENGTH,
+        SEGMENT_CONCURRENCY=SEGMENT_CONCURRENCY,
+        STREAM_COPY_SEGMENTS=STREAM_COPY_SEGMENTS,
+        SCRATCH_FOLDER=SCRATCH_FOLDER,
+        SCRATCH_QUOTA_BYTES=SCRATCH_QUOTA_BYTES,
+        STALE_FILE_MAX_AGE=STALE_FILE_MAX_AGE,
+        JOB_BACKEND=JOB_BACKEND,
+        JOB_DB_PATH=JOB_DB_PATH,
+        MAX_CONCURRENT_JOBS=MAX_CONCURRENT_JOBS,
+        MAX_QUEUED_JOBS=MAX_QUEUED_JOBS,
+        MAX_QUEUED_JOBS_PER_KEY=MAX_QUEUED_JOBS_PER_KEY,
+        MAX_RETAINED_JOBS=MAX_RETAINED_JOBS,
+        PROBE_API_ON_JOB=PROBE_API_ON_JOB,
+        QUOTA_UNITS_PER_AUDIO_MINUTE=QUOTA_UNITS_PER_AUDIO_MINUTE,
+        AUDIO_DEDUP=AUDIO_DEDUP,
+        FINGERPRINT_DB_PATH=FINGERPRINT_DB_PATH,
+        FINGERPRINT_MAX_AGE=FINGERPRINT_MAX_AGE,
+        RESPONSE_CACHE_ENTRIES=RESPONSE_CACHE_ENTRIES,
+        API_KEY_POOL=API_KEY_POOL,
+        API_KEY_POOL_FILE=API_KEY_POOL_FILE,
+        API_KEY_POOL_CONCURRENCY=API_KEY_POOL_CONCURRENCY,
+        KEY_SIDELINE_SECONDS=KEY_SIDELINE_SECONDS,
+        KEY_AUTH_SIDELINE_SECONDS=KEY_AUTH_SIDELINE_SECONDS
+    )
+    if test_config:
+        app.config.update(test_config)
     
-    try:
-        logger.info(f"Starting audio processing for file: {file_path}")
-        logger.info(f"Settings: diarization={enable_diarization}, speakers={num_speakers}, model={model_id}")
-        
-        # Log API capabilities at the beginning
-        log_elevenlabs_endpoints(api_key)
-        
-        # Split audio into segments with overlap
-        current_job['status'] = 'Splitting audio into segments'
-        logger.info("Splitting audio file into segments with overlap")
-        
-        try:
-            # Pass app.config to avoid application context issues
-            segments = split_audio(
-                file_path, 
-                SEGMENT_DURATION, 
-                OVERLAP_DURATION, 
-                app_config=app.config
-            )
-            logger.info(f"Successfully split audio into {len(segments)} segments")
-            current_job['raw_segments'] = segments  # Store raw segment information
-        except Exception as e:
-            error_details = traceback.format_exc()
-            logger.error(f"Error splitting audio: {str(e)}")
-            logger.error(f"Traceback: {error_details}")
-            current_job['status'] = f'Error splitting audio: {str(e)}'
-            current_job['complete'] = True
-            return
-        
-        # Transcribe each segment
-        segment_transcriptions = []
-        for i, segment in enumerate(segments):
-            segment_path = segment['path']
-            segment_index = segment['index']
-            
-            current_job['status'] = f'Transcribing segment {i+1} of {len(segments)}'
-            current_job['progress'] = int((i / len(segments)) * 100)
-            logger.info(f"Starting transcription of segment {i+1}/{len(segments)}: {segment_path}")
-            
-            segment_transcript = transcribe_segment_with_requests(
-                segment_path, 
-                api_key, 
-                enable_diarization, 
-                num_speakers, 
-                model_id
-            )
-            
-            # Add segment metadata to transcript
-            for item in segment_transcript:
-                item['segment_index'] = segment_index
-                item['segment_start_time'] = segment['start_time']
-                item['absolute_start'] = segment['start_time'] + item.get('start', 0)
-                item['absolute_end'] = segment['start_time'] + item.get('end', 0)
-            
-            logger.info(f"Segment {i+1} transcription result has {len(segment_transcript)} items")
-            segment_transcriptions.append(segment_transcript)
-            
-            # Update only the first segment for initial display
-            if i == 0:
-                current_job['first_segment'] = segment_transcript
-                current_job['transcript'] = segment_transcript
-            
-            # Store all segments for later processing
-            current_job['all_segments'] = segment_transcriptions
-            
-            # Clean up segment file
-            clean_up_file(segment_path)
-        
-        # Mark as ready for post-processing
-        current_job['status'] = 'Ready for speaker labeling'
-        current_job['progress'] = 100
-        current_job['stage'] = 'speaker_labeling'  # Indicate we're in the labeling stage
-        current_job['complete'] = True
-        
-        # Extract unique speakers from the first segment for labeling
-        speakers = set()
-        for item in current_job['first_segment']:
-            speakers.add(item.get('speaker', 'Unknown'))
-        
-        current_job['speakers'] = list(speakers)
-        logger.info(f"Found {len(speakers)} unique speakers in the first segment")
-        
-        # Clean up original file
-        clean_up_file(file_path)
-        
-    except Exception as e:
-        error_details = traceback.format_exc()
-        logger.error(f"Error in process_audio: {str(e)}")
-        logger.error(f"Traceback: {error_details}")
-        current_job['status'] = f'Error: {str(e)}'
-        current_job['complete'] = True
+    # Create uploads folder if it doesn't exist
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    # Create a static directory if it doesn't exist
+    os.makedirs('static/img', exist_ok=True)
+    
+    # Job records and the queues that run them
+    if api_imported:
+        app.extensions['jobs'] = create_job_backend(app.config)
+        app.extensions['responses'] = ResponseCache(app.config['RESPONSE_CACHE_ENTRIES'])
+    
+    # Remove segments and uploads left behind by jobs that crashed in a previous run,
+    # keeping those of jobs other processes still have queued or running
+    if utils_imported:
+        active_jobs = app.extensions['jobs'].jobs.active() if 'jobs' in app.extensions else ()
+        sweep_stale_files(app.config, active_jobs=active_jobs)
+    
+    # Pooled keys are loaded once here. They are limited and accounted for inside one process,
+    # so other backends can't use them
+    if api_imported:
+        key_pool = get_key_pool(app.config)
+        if key_pool is not None and app.config['JOB_BACKEND'] != 'thread':
+            logger.warning(f"API key pool disabled: it needs JOB_BACKEND=thread, not {app.config['JOB_BACKEND']}")
+            key_pool = None
+        app.extensions['key_pool'] = key_pool
+    
+    app.register_blueprint(bp)
+    return app
+
+def get_backend():
+    """Return the job backend of the running app."""
+    return current_app.extensions['jobs']
+
+@bp.before_app_request
+def start_job_workers():
+    # Embedded database workers must start in each server process, after any fork
+    if 'jobs' in current_app.extensions:
+        get_backend().ensure_workers()
+
+def get_server_key_pool():
+    """Return the key pool for jobs submitted without a key, or None when there is none.
+
+    Each key's limits and usage are kept in this process, so create_app only
+    offers the pool with the thread backend, where the jobs also run in this process.
+    """
+    return current_app.extensions.get('key_pool')
+
+# Identifies a browser across requests, so jobs on the shared key pool are still queued per submitter
+CLIENT_COOKIE = 'scribe_client'
+
+def client_id():
+    """Return the submitting client's id: its cookie, or its address for clients without one."""
+    return request.cookies.get(CLIENT_COOKIE) or request.remote_addr or 'unknown'
+
+# Returned by polling endpoints before any job has been submitted
+EMPTY_JOB = new_job(id=None) if api_imported else {}
+
+def get_job(job_id=None, fields=None):
+    """Look up a job by id, falling back to the most recently submitted job.
+
+    With `fields`, stored jobs are read with only those fields (plus id), leaving
+    large ones such as transcripts to be fetched when they are actually needed.
+    """
+    jobs = get_backend().jobs
+    job_id = job_id or request.args.get('job_id')
+    job = jobs.get(job_id, fields) if job_id else jobs.latest(fields)
+    return job or EMPTY_JOB
+
+def job_field(current_job, field):
+    """Return a job's field, reading it from the store if the record was loaded without it."""
+    fetch = getattr(current_job, 'fetch', None)
+    return fetch(field) if fetch else current_job.get(field)
+
+# Fields the polling endpoints need besides the transcript itself
+PROGRESS_FIELDS = ('status', 'progress', 'complete', 'speakers')
+
+def transcript_response(endpoint, current_job, field, meta=None, offset=0, limit=None):
+    """Respond with meta plus job[field] as 'transcript', reusing the encoded body until either changes.
+
+    Only entries from `offset` (up to `limit` of them) are sent, along with the
+    offset and the transcript's total length. `shape=columns` returns them as
+    per-field lists instead of one object per entry.
+    """
+    meta = meta or {}
+    shape = request.args.get('shape', 'rows')
+    version = (field_version(current_job, field), tuple(meta.items()))
+    # The whole document is cached per version and sliced per request, so the transcript is
+    # only read from the job (and decoded, for stored jobs) when the version has changed
+    return current_app.extensions['responses'].respond(
+        request,
+        (endpoint, current_job['id'], shape),
+        version,
+        lambda: (meta, job_field(current_job, field) or []),
+        shape=shape,
+        offset=offset,
+        limit=limit
+    )
 
 def ensure_logo_exists():
     """Make sure we have the ElevenLabs logo downloaded."""
@@ -186,7 +211,7 @@ def ensure_logo_exists():
             logger.warning(f"Error downloading logo: {str(e)}")
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def index():
     if import_errors:
         error_html = """
@@ -228,12 +253,15 @@ def index():
         </html>
         """ % '\n'.join(import_errors)
         return error_html
-    return render_template('index.html')
+    response = current_app.make_response(
+        render_template('index.html', key_pool_enabled=get_server_key_pool() is not None)
+    )
+    if CLIENT_COOKIE not in request.cookies:
+        response.set_cookie(CLIENT_COOKIE, uuid.uuid4().hex, max_age=365 * 24 * 60 * 60, httponly=True, samesite='Lax')
+    return response
 
-@app.route('/transcribe', methods=['POST'])
+@bp.route('/transcribe', methods=['POST'])
 def transcribe():
-    global current_job
-    
     # Get file and API key from the request
     audio_file = request.files.get('audio')
     api_key = request.form.get('api_key')
@@ -243,71 +271,113 @@ def transcribe():
     num_speakers = request.form.get('num_speakers', '')
     model_id = request.form.get('model_id', 'scribe_v1')
     
+    # Without a key of its own, the job uses the server's key pool when one is configured.
+    # Pool jobs share a credential, so queue fairness and transcript reuse go by submitter instead
+    fairness_key = api_key
+    submitter = None
+    if not api_key and get_server_key_pool() is not None:
+        api_key = POOL_API_KEY
+        submitter = hash_api_key(client_id())
+        fairness_key = f"{POOL_API_KEY}:{submitter}"
+    
     if not audio_file or not api_key:
         return jsonify({'error': 'Missing audio file or API key'}), 400
     
-    # Save uploaded file before starting the thread
+    # Refuse keys whose cached quota is already exhausted, before saving the upload
+    try:
+        check_quota(api_key, 0)
+    except QuotaExceededError as e:
+        return jsonify({'error': str(e)}), 402
+    
+    # Warm the capability cache off the request path so later admission checks have data
+    if current_app.config.get('PROBE_API_ON_JOB') and api_key != POOL_API_KEY:
+        capabilities.refresh_in_background(api_key)
+    
+    # Save uploaded file before queueing the job, timing it for the job's breakdown
+    upload_timing = {}
     try:
-        file_path = save_uploaded_file(audio_file)
+        with bind_job(upload_timing), span('upload_save'):
+            file_path = save_uploaded_file(audio_file)
     except Exception as e:
         return jsonify({'error': f'Failed to save file: {str(e)}'}), 500
     
-    # Reset current job
-    current_job = {
-        'id': str(uuid.uuid4()),
-        'progress': 0,
-        'status': 'Processing audio file',
-        'complete': False,
-        'transcript': [],
-        'file_path': file_path,
-        'enable_diarization': enable_diarization,
-        'num_speakers': num_speakers,
-        'model_id': model_id,
-        'processing_progress': 0,
-        'processing_complete': False
-    }
+    # Create a new job
+    job = new_job(
+        status='Queued',
+        timings=upload_timing.get('timings', {}),
+        file_path=file_path,
+        enable_diarization=enable_diarization,
+        num_speakers=num_speakers,
+        model_id=model_id,
+        submitter=submitter
+    )
     
-    # Start processing in a background thread
-    threading.Thread(
-        target=process_audio, 
-        args=(
+    # Register the job before a worker can pick it up
+    job = get_backend().jobs.add(job)
+    
+    # Queue processing on the transcription workers
+    try:
+        get_backend().submit(
+            'transcribe',
+            job,
+            fairness_key,
             file_path, 
             api_key, 
             enable_diarization, 
             num_speakers, 
             model_id
         )
-    ).start()
+    except QueueFullError as e:
+        clean_up_file(file_path)
+        logger.warning(f"Rejected transcription job: {str(e)}")
+        job['status'] = f'Rejected: {str(e)}'
+        job['complete'] = True
+        status_code = 429 if e.per_key else 503
+        return jsonify({'error': str(e)}), status_code, {'Retry-After': str(QUEUE_RETRY_AFTER)}
     
-    return jsonify({'job_id': current_job['id']}), 202
+    return jsonify({'job_id': job['id']}), 202
 
-@app.route('/progress', methods=['GET'])
+@bp.route('/progress', methods=['GET'])
 def progress():
-    return jsonify({
+    """Job progress plus the live transcript from entry `since` on (clients pass what they already have)."""
+    current_job = get_job(fields=PROGRESS_FIELDS)
+    status = current_job['status']
+    queue_position = get_backend().position(current_job['id']) if current_job['id'] else None
+    if queue_position:
+        status = f'Queued (position {queue_position})'
+    return transcript_response('progress', current_job, 'transcript', {
+        'job_id': current_job['id'],
         'progress': current_job['progress'],
-        'status': current_job['status'],
-        'complete': current_job['complete'],
-        'transcript': current_job['transcript']
-    })
+        'status': status,
+        'queue_position': queue_position,
+        'speakers_ready': bool(current_job.get('speakers')),
+        'complete': current_job['complete']
+    }, offset=request.args.get('since', 0, type=int))
 
-@app.route('/result', methods=['GET'])
+@bp.route('/result', methods=['GET'])
 def result():
-    return jsonify({
-        'transcript': current_job['transcript']
-    })
+    return transcript_response(
+        'result', get_job(fields=PROGRESS_FIELDS), 'transcript',
+        offset=request.args.get('offset', 0, type=int),
+        limit=request.args.get('limit', type=int)
+    )
 
-@app.route('/speakers', methods=['GET'])
+@bp.route('/speakers', methods=['GET'])
 def get_speakers():
+    current_job = get_job()
     speakers = current_job.get('speakers', [])
-    return jsonify({'speakers': speakers})
+    # First thing each speaker says, to help users recognise them
+    examples = {}
+    for item in current_job.get('first_segment', []):
+        examples.setdefault(item.get('speaker', 'Unknown'), item.get('text', ''))
+    return jsonify({'speakers': speakers, 'examples': examples})
 
-@app.route('/process-transcript', methods=['POST'])
+@bp.route('/process-transcript', methods=['POST'])
 def process_transcript():
-    global current_job
-    
     # Get speaker labels from request
     data = request.json
     speaker_labels = data.get('speaker_labels', {})
+    current_job = get_job(data.get('job_id'))
     
     # Log the received speaker labels for debugging
     logger.info(f"Received speaker labels: {speaker_labels}")
@@ -315,43 +385,167 @@ def process_transcript():
     if not speaker_labels:
         return jsonify({"error": "No speaker labels provided"}), 400
     
+    if not current_job['id']:
+        return jsonify({"error": "No transcription job found"}), 404
+    
     # Reset processing status to ensure fresh processing
     current_job["processing_progress"] = 0
     current_job["processing_complete"] = False
     current_job["final_transcript"] = []  # Clear any existing final transcript
+    current_job["transcript_index"] = None
+    
+    if not current_job.get('complete'):
+        # Labels can be given while the tail is still transcribing; they are stored on the job
+        # and applied by its transcription worker once it finishes, so no worker waits for it
+        current_job["status"] = "Speaker labels saved, applying them when transcription finishes"
+        current_job["pending_speaker_labels"] = speaker_labels
+        # Transcription may have finished (and checked for labels) since the job was read
+        if hasattr(current_job, 'reload'):
+            current_job.reload()
+        if not current_job.get('complete'):
+            return jsonify({"status": "deferred"}), 202
+        speaker_labels = current_job.pop('pending_speaker_labels', None)
+        if not speaker_labels:
+            # The transcription worker took the labels and is applying them
+            return jsonify({"status": "processing"}), 202
     
     current_job["status"] = "Processing transcript with custom speaker labels"
     
-    # Start processing in background thread
-    threading.Thread(
-        target=process_transcript_with_labels, 
-        args=(current_job, speaker_labels)
-    ).start()
+    # Queue processing on the post-processing workers
+    try:
+        # Labels carry no API key, so fairness on this queue is per job
+        get_backend().submit(
+            'process',
+            current_job,
+            current_job['id'],
+            speaker_labels
+        )
+    except QueueFullError as e:
+        current_job["status"] = "Ready for speaker labeling"
+        current_job["processing_complete"] = True
+        logger.warning(f"Rejected transcript processing: {str(e)}")
+        status_code = 429 if e.per_key else 503
+        return jsonify({'error': str(e)}), status_code, {'Retry-After': str(QUEUE_RETRY_AFTER)}
     
     return jsonify({"status": "processing"}), 202
 
-@app.route('/processing-progress', methods=['GET'])
+@bp.route('/processing-progress', methods=['GET'])
 def processing_progress():
+    current_job = get_job()
     return jsonify({
         'progress': current_job.get('processing_progress', 0),
         'status': current_job.get('status', 'Processing'),
+        'transcription_complete': current_job.get('complete', False),
         'complete': current_job.get('processing_complete', False)
     })
 
-@app.route('/final-transcript', methods=['GET'])
+@bp.route('/final-transcript', methods=['GET'])
 def get_final_transcript():
-    final_transcript = current_job.get('final_transcript', [])
+    current_job = get_job(fields=PROGRESS_FIELDS)
+    return transcript_response(
+        'final-transcript', current_job, 'final_transcript',
+        offset=request.args.get('offset', 0, type=int),
+        limit=request.args.get('limit', type=int)
+    )
+
+@bp.route('/search', methods=['GET'])
+def search_transcript():
+    """Find a phrase in a job's final transcript, or in every stored job with scope=all."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query (q)'}), 400
+    limit = request.args.get('limit', 50, type=int)
+    
+    if request.args.get('scope') == 'all':
+        return jsonify({'query': query, 'hits': get_backend().jobs.search(query, limit)})
+    
+    current_job = get_job()
+    index = current_job.get('transcript_index')
+    if not index:
+        return jsonify({'error': 'Transcript has not been indexed yet'}), 409
+    return jsonify({
+        'job_id': current_job['id'],
+        'query': query,
+        'hits': search_index(index, current_job['final_transcript'], query, limit)
+    })
+
+@bp.route('/seek', methods=['GET'])
+def seek_transcript():
+    """Return the final transcript entries around a time (?at=<ms>)."""
+    at = request.args.get('at', type=float)
+    if at is None:
+        return jsonify({'error': 'Missing or invalid time (at, in milliseconds)'}), 400
+    context = request.args.get('context', 2, type=int)
     
-    # Add debug logging
-    logger.info(f"Returning final transcript with {len(final_transcript)} entries")
-    if len(final_transcript) > 0:
-        logger.debug(f"Sample entry: {final_transcript[0]}")
+    current_job = get_job()
+    index = current_job.get('transcript_index')
+    if not index:
+        return jsonify({'error': 'Transcript has not been indexed yet'}), 409
+    current, entries = seek(index, current_job['final_transcript'], at, max(0, context))
+    return jsonify({'job_id': current_job['id'], 'at': at, 'entry': current, 'entries': entries})
+
+@bp.route('/export/<fmt>', methods=['GET'])
+def export_transcript(fmt):
+    """Stream the transcript as SRT, WebVTT, JSONL or timestamped text."""
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown export format '{fmt}', expected one of {sorted(EXPORT_FORMATS)}"}), 400
     
-    return jsonify({'transcript': final_transcript})
+    current_job = get_job()
+    entries = current_job.get('final_transcript') or []
+    if not entries:
+        # Before speaker labels are applied, export the preview transcript on the absolute timeline
+        entries = (
+            dict(item, start=item.get('absolute_start', item.get('start', 0)), end=item.get('absolute_end', item.get('end', 0)))
+            for item in current_job.get('transcript', [])
+        )
+    
+    generate, mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        generate(entries),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=transcript.{extension}'}
+    )
+
+@bp.route('/queue', methods=['GET'])
+def queue_status():
+    """Report worker pool utilisation and queue depth."""
+    return jsonify(get_backend().stats())
+
+@bp.route('/key-pool', methods=['GET'])
+def key_pool_usage():
+    """Report each pooled API key's limits, sideline state and usage (keys appear only as hashes)."""
+    key_pool = get_server_key_pool()
+    if key_pool is None:
+        return jsonify({'error': 'No API key pool is configured (it needs JOB_BACKEND=thread)'}), 404
+    return jsonify(key_pool.report())
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose stage timings, API traffic and queue depth in the Prometheus text format."""
+    stats = get_backend().stats()
+    for queue_name, queue_stats in stats.items():
+        if isinstance(queue_stats, dict):
+            for state in ('queued', 'running'):
+                metrics.set_gauge(
+                    'scribe_queue_jobs', queue_stats.get(state, 0),
+                    help='Jobs waiting for or running on a worker', queue=queue_name, state=state
+                )
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/job-timings', methods=['GET'])
+def job_timings():
+    """Per-stage timing breakdown and API traffic of a job."""
+    current_job = get_job()
+    return jsonify({
+        'job_id': current_job['id'],
+        'timings': current_job.get('timings', {}),
+        'api_bytes': current_job.get('api_bytes', {'sent': 0, 'received': 0})
+    })
 
-@app.route('/debug-transcript', methods=['GET'])
+@bp.route('/debug-transcript', methods=['GET'])
 def debug_transcript():
     """Debug endpoint to show the current state of transcript processing."""
+    current_job = get_job()
     return jsonify({
         'job_status': current_job.get('status', 'Unknown'),
         'processing_complete': current_job.get('processing_complete', False),
@@ -362,7 +556,7 @@ def debug_transcript():
         'has_all_segments': 'all_segments' in current_job
     })
 
-@app.route('/logo')
+@bp.route('/logo')
 def logo():
     """Serve the ElevenLabs logo."""
     try:
@@ -373,5 +567,7 @@ def logo():
         return redirect('https://elevenlabs.io/images/logo.png')
 
 if __name__ == '__main__':
-    ensure_logo_exists()
-    app.run(debug=True) 
\ No newline at end of file
+    # Development server only; use wsgi.py with a production server such as gunicorn
+    # The logo ships in static/img; only a missing copy is fetched, in the background
+    threading.Thread(target=ensure_logo_exists, daemon=True).start()
+    create_app().run(debug=True) 
\ No newline at end of file
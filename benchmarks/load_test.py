@@ -0,0 +1,82 @@
+"""
+Concurrent polling load test against a running server.
+
+    gunicorn --preload -w 4 -b 127.0.0.1:8000 wsgi:app
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --clients 32 --duration 20
+
+Prints throughput and latency percentiles as JSON so runs with different
+server settings (worker count, JOB_BACKEND) can be compared.
+"""
+import argparse
+import json
+import threading
+import time
+
+import requests
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run_client(url, deadline, latencies, errors, lock):
+    session = requests.Session()
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=10)
+            if response.status_code != 200:
+                local_errors += 1
+        except requests.RequestException:
+            local_errors += 1
+        local_latencies.append(time.perf_counter() - started)
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+def run_load_test(base_url, path='/progress', clients=16, duration=10.0):
+    """Hit base_url + path from concurrent clients for duration seconds and summarise."""
+    url = base_url.rstrip('/') + path
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=run_client, args=(url, deadline, latencies, errors, lock))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'url': url,
+        'clients': clients,
+        'duration_s': round(elapsed, 3),
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            'p95': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None
+        }
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure concurrent request throughput of a running server.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='server base URL')
+    parser.add_argument('--path', default='/progress', help='endpoint to poll')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    args = parser.parse_args(argv)
+    print(json.dumps(run_load_test(args.url, args.path, args.clients, args.duration), indent=2))
+
+if __name__ == '__main__':
+    main()
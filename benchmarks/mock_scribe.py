@@ -0,0 +1,164 @@
+"""
+Local mock of the ElevenLabs speech-to-text API for benchmarks.
+
+    python benchmarks/mock_scribe.py --port 8765 --latency 0.5 --error-rate 0.05
+
+Answers POST /v1/speech-to-text with a diarized `words` payload covering the
+uploaded audio's duration, after a configurable latency, and fails a configurable
+fraction of requests with 429/500. GET /v1/models and /v1/user/subscription
+return minimal payloads so capability checks work too.
+"""
+import argparse
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the a of to and in that it is was for on with as be at this have from by "
+    "meeting project schedule budget review segment audio transcript speaker "
+    "question answer today tomorrow quarter plan team update result number"
+).split()
+
+def audio_duration_seconds(audio_bytes, assumed_kbps=128):
+    """Probe the duration of uploaded audio, falling back to a bitrate estimate."""
+    try:
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(audio_bytes)
+            f.flush()
+            output = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', f.name],
+                capture_output=True, text=True
+            ).stdout
+            return float(json.loads(output)['format']['duration'])
+    except (OSError, ValueError, KeyError):
+        return len(audio_bytes) * 8 / (assumed_kbps * 1000)
+
+def make_words(duration, num_speakers, words_per_second, rng):
+    """Build a Scribe-style diarized word list spanning duration seconds."""
+    words = []
+    speaker = 0
+    turn_left = rng.randint(5, 40)
+    t = 0.0
+    step = 1.0 / words_per_second
+    while t + step <= duration:
+        if turn_left == 0:
+            speaker = (speaker + rng.randint(1, max(1, num_speakers - 1))) % num_speakers
+            turn_left = rng.randint(5, 40)
+        end = t + step * 0.8
+        words.append({
+            'text': rng.choice(WORDS),
+            'start': round(t, 3),
+            'end': round(end, 3),
+            'type': 'word',
+            'speaker_id': f'speaker_{speaker}'
+        })
+        words.append({
+            'text': ' ',
+            'start': round(end, 3),
+            'end': round(t + step, 3),
+            'type': 'spacing',
+            'speaker_id': f'speaker_{speaker}'
+        })
+        t += step
+        turn_left -= 1
+    return words
+
+class MockScribeHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    settings = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/v1/models'):
+            self._send_json(200, [{'model_id': 'scribe_v1', 'name': 'Scribe v1', 'description': 'speech-to-text'}])
+        elif self.path.startswith('/v1/user/subscription'):
+            self._send_json(200, {'tier': 'mock', 'character_count': 0, 'character_limit': 10 ** 9})
+        else:
+            self._send_json(404, {'detail': 'not found'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.startswith('/v1/speech-to-text'):
+            self._send_json(404, {'detail': 'not found'})
+            return
+
+        settings = self.settings
+        rng = random.Random()
+        time.sleep(max(0.0, settings['latency'] + rng.uniform(-settings['jitter'], settings['jitter'])))
+        if rng.random() < settings['error_rate']:
+            self._send_json(rng.choice((429, 500)), {'detail': 'mock failure'})
+            return
+
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8') + body
+        )
+        audio = b''
+        num_speakers = settings['speakers']
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                audio = part.get_payload(decode=True) or b''
+            elif name == 'num_speakers':
+                num_speakers = int(part.get_content().strip() or num_speakers)
+
+        words = make_words(audio_duration_seconds(audio), num_speakers, settings['words_per_second'], rng)
+        self._send_json(200, {
+            'language_code': 'en',
+            'text': ''.join(word['text'] for word in words),
+            'words': words
+        })
+
+def make_server(port=0, latency=0.2, jitter=0.05, error_rate=0.0, speakers=2, words_per_second=2.5):
+    """Create a mock server; port 0 picks a free port (see server.server_address)."""
+    handler = type('ConfiguredMockScribeHandler', (MockScribeHandler,), {
+        'settings': {
+            'latency': latency,
+            'jitter': jitter,
+            'error_rate': error_rate,
+            'speakers': speakers,
+            'words_per_second': words_per_second
+        }
+    })
+    return ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+def start_in_background(**kwargs):
+    """Start a mock server on a daemon thread and return it."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mock ElevenLabs speech-to-text server.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.05, help='random +/- seconds added to latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--speakers', type=int, default=2)
+    parser.add_argument('--words-per-second', type=float, default=2.5)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.port, args.latency, args.jitter, args.error_rate, args.speakers, args.words_per_second)
+    print(f"Mock Scribe API listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+End-to-end pipeline benchmark against a local mock Scribe server.
+
+    python benchmarks/run_benchmark.py --minutes 30 --latency 0.5 --output results.json
+
+Generates synthetic audio with FFmpeg (a sine tone mixed with noise), starts
+benchmarks/mock_scribe.py in-process, then runs the transcription job and the
+speaker-label merge exactly as the workers do. Reports wall time, per-stage
+times, peak RSS and bytes uploaded as JSON for regression tracking.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_scribe
+
+def generate_audio(path, seconds, frequency=440, noise_amplitude=0.1):
+    """Write `seconds` of mono MP3 (sine plus pink noise) to path with FFmpeg's lavfi sources."""
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f'sine=frequency={frequency}:sample_rate=44100:duration={seconds}',
+        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude={noise_amplitude}:sample_rate=44100:duration={seconds}',
+        '-filter_complex', 'amix=inputs=2:duration=shortest',
+        '-ac', '1', '-c:a', 'libmp3lame', '-b:a', '128k',
+        path
+    ], check=True)
+
+def peak_rss_mb():
+    """Return peak resident set size (MB) of this process and of its finished children (FFmpeg)."""
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if platform.system() == 'Darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+def run_once(audio_path, scratch, args):
+    """Transcribe and merge one copy of the benchmark audio, returning its measurements."""
+    from modules.jobs import new_job
+    from modules.metrics import bind_job, span
+    from modules.pipeline import run_job
+    from modules.transcription import merge_transcriptions
+
+    # process_audio removes the upload when it finishes, so work on a copy
+    upload = os.path.join(scratch, 'upload.mp3')
+    with open(audio_path, 'rb') as src, open(upload, 'wb') as dst:
+        dst.write(src.read())
+
+    app_config = {
+        'UPLOAD_FOLDER': scratch,
+        'SCRATCH_FOLDER': os.path.join(scratch, 'scratch'),
+        'STREAM_COPY_SEGMENTS': not args.reencode
+    }
+    job = new_job()
+    started = time.perf_counter()
+    run_job('transcribe', job, [upload, 'benchmark-key', True, str(args.speakers), 'scribe_v1'], app_config)
+    transcribed = time.perf_counter()
+
+    speaker_labels = {speaker: f'Speaker {speaker}' for speaker in job.get('speakers', [])}
+    with bind_job(job):
+        with span('merge'):
+            final_transcript = merge_transcriptions(job.get('all_segments', []), speaker_labels, job.get('raw_segments'))
+    finished = time.perf_counter()
+
+    return {
+        'status': job['status'],
+        'segments': len(job.get('raw_segments') or []),
+        'entries': len(final_transcript),
+        'wall_s': round(finished - started, 3),
+        'transcribe_s': round(transcribed - started, 3),
+        'merge_s': round(finished - transcribed, 3),
+        'stages': job.get('timings', {}),
+        'api_bytes': job.get('api_bytes', {'sent': 0, 'received': 0})
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the transcription pipeline against a mock Scribe API.')
+    parser.add_argument('--minutes', type=float, default=20, help='length of the synthetic audio')
+    parser.add_argument('--runs', type=int, default=1, help='repetitions over the same audio')
+    parser.add_argument('--latency', type=float, default=0.2, help='mock API seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.05, help='mock API random +/- seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of mock API requests that fail')
+    parser.add_argument('--speakers', type=int, default=2, help='speakers in the mock transcripts')
+    parser.add_argument('--reencode', action='store_true', help='disable stream-copy segmenting')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    server = mock_scribe.start_in_background(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        speakers=args.speakers
+    )
+    # Must be set before config is imported by the modules under test
+    os.environ['ELEVENLABS_API_BASE'] = f'http://127.0.0.1:{server.server_address[1]}'
+
+    with tempfile.TemporaryDirectory() as scratch:
+        audio_path = os.path.join(scratch, 'benchmark.mp3')
+        generated = time.perf_counter()
+        generate_audio(audio_path, int(args.minutes * 60))
+        generate_s = time.perf_counter() - generated
+
+        runs = [run_once(audio_path, scratch, args) for _ in range(args.runs)]
+
+    server.shutdown()
+    report = {
+        'params': {
+            'audio_minutes': args.minutes,
+            'latency_s': args.latency,
+            'jitter_s': args.jitter,
+            'error_rate': args.error_rate,
+            'speakers': args.speakers,
+            'stream_copy': not args.reencode
+        },
+        'python': platform.python_version(),
+        'generate_audio_s': round(generate_s, 3),
+        'runs': runs,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
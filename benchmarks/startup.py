@@ -0,0 +1,98 @@
+"""
+Startup and per-job overhead benchmark.
+
+    python benchmarks/startup.py --runs 5
+
+Measures cold import + create_app time in fresh interpreters, and the time
+process_audio spends before it starts splitting audio (network probes, workspace
+setup). Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLD_START_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    "from wsgi import app; "
+    "print(time.perf_counter() - started)"
+)
+
+def measure_cold_start(runs):
+    """Return cold start times (seconds) of `from wsgi import app` in fresh interpreters."""
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_SNIPPET],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+class _SplitReached(Exception):
+    pass
+
+def measure_time_to_split(runs, probe):
+    """Return the time (seconds) process_audio takes to reach split_audio."""
+    from modules import pipeline
+    from modules.api import capabilities
+    from modules.jobs import new_job
+
+    original_split = pipeline.split_audio
+    reached = {}
+
+    def record_split(*args, **kwargs):
+        reached['at'] = time.perf_counter()
+        raise _SplitReached()
+
+    pipeline.split_audio = record_split
+    times = []
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            app_config = {
+                'UPLOAD_FOLDER': scratch,
+                'SCRATCH_FOLDER': os.path.join(scratch, 'scratch'),
+                'PROBE_API_ON_JOB': probe
+            }
+            for _ in range(runs):
+                upload = os.path.join(scratch, 'upload.mp3')
+                with open(upload, 'wb') as f:
+                    f.write(b'\0' * 1024)
+                reached.clear()
+                capabilities.invalidate()
+                started = time.perf_counter()
+                pipeline.process_audio(new_job(), upload, 'benchmark-key', app_config=app_config)
+                times.append(reached['at'] - started)
+    finally:
+        pipeline.split_audio = original_split
+    return times
+
+def summarise(times):
+    return {
+        'runs': len(times),
+        'median_ms': round(statistics.median(times) * 1000, 2),
+        'max_ms': round(max(times) * 1000, 2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold start and per-job overhead.')
+    parser.add_argument('--runs', type=int, default=5, help='repetitions per measurement')
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    report = {
+        'cold_start': summarise(measure_cold_start(args.runs)),
+        'time_to_split': summarise(measure_time_to_split(args.runs, probe=False)),
+        'time_to_split_with_probe': summarise(measure_time_to_split(args.runs, probe=True))
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
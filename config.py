@@ -6,12 +6,88 @@ UPLOAD_FOLDER = 'uploads'
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max upload
 SECRET_KEY = os.environ.get('SECRET_KEY', 'dev_key')
 
+# ElevenLabs API base URL (overridden to point benchmarks at a local mock server)
+ELEVENLABS_API_BASE = os.environ.get('ELEVENLABS_API_BASE', 'https://api.elevenlabs.io').rstrip('/')
+
 # Segment duration in milliseconds (8 minutes)
 SEGMENT_DURATION = 8 * 60 * 1000
 
 # Overlap duration in milliseconds (10 seconds)
 OVERLAP_DURATION = 10 * 1000
 
+# Segments of one job sent to the API at the same time
+SEGMENT_CONCURRENCY = int(os.environ.get('SEGMENT_CONCURRENCY', 3))
+
+# Cut segments with stream copy when the source codec is already Scribe-compatible
+STREAM_COPY_SEGMENTS = os.environ.get('STREAM_COPY_SEGMENTS', 'true').lower() == 'true'
+
+# Scratch space for per-job segment files (defaults to tmpfs at /dev/shm when available)
+SCRATCH_FOLDER = os.environ.get('SCRATCH_FOLDER') or None
+
+# Maximum bytes of segment files allowed in a scratch root (0 disables the guard)
+SCRATCH_QUOTA_BYTES = int(os.environ.get('SCRATCH_QUOTA_BYTES', 2 * 1024 * 1024 * 1024))
+
+# Age in seconds after which leftover workspaces and uploads are swept at startup
+STALE_FILE_MAX_AGE = int(os.environ.get('STALE_FILE_MAX_AGE', 6 * 60 * 60))
+
+# Number of transcription jobs processed at the same time (with JOB_BACKEND=sqlite, across all
+# server processes; standalone workers each run one job at a time)
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+
+# Jobs waiting for a worker before new uploads are refused with 503
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', 20))
+
+# Jobs a single API key may have waiting before it is refused with 429
+MAX_QUEUED_JOBS_PER_KEY = int(os.environ.get('MAX_QUEUED_JOBS_PER_KEY', 5))
+
+# Finished jobs kept in memory for polling
+MAX_RETAINED_JOBS = 50
+
+# Seconds clients are asked to wait before retrying a refused job
+QUEUE_RETRY_AFTER = 30
+
+# Where jobs run: 'thread' (worker pool inside the web server), 'sqlite' (job state in JOB_DB_PATH,
+# run by embedded workers in every web process, with MAX_CONCURRENT_JOBS enforced in the database)
+# or 'worker' (separate `python -m modules.worker` processes sharing JOB_DB_PATH and UPLOAD_FOLDER)
+JOB_BACKEND = os.environ.get('JOB_BACKEND', 'thread')
+
+# SQLite database holding queued jobs and their state in worker mode
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join('data', 'jobs.sqlite3'))
+
+# Fingerprint recordings and reuse transcripts of audio the same API key already had transcribed.
+# Keeps fingerprints and transcripts of finished jobs in FINGERPRINT_DB_PATH for FINGERPRINT_MAX_AGE seconds
+AUDIO_DEDUP = os.environ.get('AUDIO_DEDUP', 'false').lower() == 'true'
+FINGERPRINT_DB_PATH = os.environ.get('FINGERPRINT_DB_PATH', os.path.join('data', 'fingerprints.sqlite3'))
+FINGERPRINT_MAX_AGE = int(os.environ.get('FINGERPRINT_MAX_AGE', 30 * 24 * 60 * 60))
+
+# Encoded transcript responses kept in memory (one per endpoint, job and shape)
+RESPONSE_CACHE_ENTRIES = int(os.environ.get('RESPONSE_CACHE_ENTRIES', 64))
+
+# Server-side ElevenLabs keys for jobs submitted without their own key: comma-separated
+# in API_KEY_POOL and/or one per line in API_KEY_POOL_FILE
+API_KEY_POOL = [key.strip() for key in os.environ.get('API_KEY_POOL', '').split(',') if key.strip()]
+API_KEY_POOL_FILE = os.environ.get('API_KEY_POOL_FILE') or None
+
+# Concurrent segment requests per pooled key, before rate limiting lowers it
+API_KEY_POOL_CONCURRENCY = int(os.environ.get('API_KEY_POOL_CONCURRENCY', 3))
+
+# How long a pooled key is sidelined after a 429 without Retry-After, and after a 401 (seconds)
+KEY_SIDELINE_SECONDS = 60
+KEY_AUTH_SIDELINE_SECONDS = 60 * 60
+
+# Fetch each key's models and quota in the background when it submits a job
+PROBE_API_ON_JOB = os.environ.get('PROBE_API_ON_JOB', 'false').lower() == 'true'
+
+# Seconds a key's cached models and quota stay valid
+CAPABILITY_CACHE_TTL = 60 * 60
+
+# Quota units one minute of audio costs, used to refuse jobs a key cannot afford (0 only refuses exhausted keys)
+QUOTA_UNITS_PER_AUDIO_MINUTE = float(os.environ.get('QUOTA_UNITS_PER_AUDIO_MINUTE', 0))
+
+# Log full API responses and transcripts (large on long jobs); when enabled, only this fraction is logged
+LOG_API_PAYLOADS = os.environ.get('LOG_API_PAYLOADS', 'false').lower() == 'true'
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get('PAYLOAD_LOG_SAMPLE_RATE', 0.05))
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -1,82 +1,149 @@
-import requests
 import logging
-import traceback
+import threading
+import time
+
+from config import CAPABILITY_CACHE_TTL, ELEVENLABS_API_BASE
+from modules.jobs import hash_api_key
 
 logger = logging.getLogger(__name__)
 
-def log_elevenlabs_endpoints(api_key):
-    """Log available ElevenLabs API endpoints for troubleshooting."""
-    try:
-        headers = {
-            'xi-api-key': api_key,
-            'Accept': 'application/json'
-        }
-        
-        # Try to get the OpenAPI spec
-        response = requests.get(
-            'https://api.elevenlabs.io/v1/docs',
-            headers=headers
-        )
-        
-        if response.status_code == 200:
-            logger.info("Successfully retrieved ElevenLabs API spec")
-        else:
-            logger.warning(f"Could not retrieve API spec, status: {response.status_code}")
-            
-        # Try listing the models (should work for all accounts)
-        response = requests.get(
-            'https://api.elevenlabs.io/v1/models',
-            headers=headers
+class QuotaExceededError(Exception):
+    """Raised when a job would use more quota than the API key has left."""
+
+def _is_scribe_model(model):
+    """Check if a model entry indicates Scribe/speech recognition capability."""
+    model_id = model.get('model_id', '').lower()
+    name = model.get('name', '').lower()
+    description = model.get('description', '').lower()
+    return ('whisper' in model_id or 
+            'scribe' in model_id or 
+            'transcription' in name or 
+            'speech recognition' in description or
+            'speech-to-text' in description)
+
+def fetch_capabilities(api_key):
+    """Query the models and subscription available to an API key and summarise them."""
+    import requests  # Imported lazily to keep app startup fast
+    
+    headers = {
+        'xi-api-key': api_key,
+        'Accept': 'application/json'
+    }
+    capabilities = {
+        'models': [],
+        'has_scribe': False,
+        'tier': None,
+        'character_count': None,
+        'character_limit': None,
+        'remaining': None,
+        'fetched_at': time.time()
+    }
+    
+    response = requests.get(f'{ELEVENLABS_API_BASE}/v1/models', headers=headers)
+    if response.status_code == 200:
+        models_data = response.json()
+        models = models_data.get('models', []) if isinstance(models_data, dict) else models_data
+        capabilities['models'] = [model.get('model_id') for model in models]
+        capabilities['has_scribe'] = any(_is_scribe_model(model) for model in models)
+    else:
+        logger.warning(f"Failed to retrieve models: {response.status_code}")
+    
+    response = requests.get(f'{ELEVENLABS_API_BASE}/v1/user/subscription', headers=headers)
+    if response.status_code == 200:
+        subscription = response.json()
+        capabilities['tier'] = subscription.get('tier')
+        capabilities['character_count'] = subscription.get('character_count')
+        capabilities['character_limit'] = subscription.get('character_limit')
+        if capabilities['character_count'] is not None and capabilities['character_limit'] is not None:
+            capabilities['remaining'] = capabilities['character_limit'] - capabilities['character_count']
+    else:
+        logger.warning(f"Failed to retrieve subscription: {response.status_code}")
+    
+    return capabilities
+
+class CapabilityCache:
+    """Per-API-key cache of models, quota and tier, keyed by a hash of the key."""
+
+    def __init__(self, ttl=3600, fetch=fetch_capabilities):
+        self.ttl = ttl
+        self.fetch = fetch
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def peek(self, api_key):
+        """Return cached capabilities without any network access, or None if missing or stale."""
+        entry = self._entries.get(hash_api_key(api_key))
+        if entry is None or time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry
+
+    def get(self, api_key, refresh=False):
+        """Return capabilities for a key, fetching them when missing, stale or refresh is set."""
+        entry = None if refresh else self.peek(api_key)
+        if entry is None:
+            entry = self.fetch(api_key)
+            with self._lock:
+                self._entries[hash_api_key(api_key)] = entry
+        return entry
+
+    def refresh_in_background(self, api_key):
+        """Fetch capabilities on a background thread unless they are cached or already being fetched."""
+        key = hash_api_key(api_key)
+        with self._lock:
+            if key in self._refreshing or self.peek(api_key) is not None:
+                return False
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.get(api_key, refresh=True)
+            except Exception as e:
+                logger.warning(f"Error fetching capabilities for key {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='capability-refresh', daemon=True).start()
+        return True
+
+    def record_usage(self, api_key, units):
+        """Deduct usage from the cached remaining quota so admission sees it before the next refresh."""
+        entry = self.peek(api_key)
+        if entry is not None and entry.get('remaining') is not None:
+            with self._lock:
+                entry['remaining'] -= units
+
+    def invalidate(self, api_key=None):
+        """Drop the cached entry for a key, or every entry when no key is given."""
+        with self._lock:
+            if api_key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(hash_api_key(api_key), None)
+
+# Shared cache used by the web server and job workers
+capabilities = CapabilityCache(ttl=CAPABILITY_CACHE_TTL)
+
+def check_quota(api_key, audio_duration_ms, units_per_minute=0):
+    """Raise QuotaExceededError if cached quota shows the key cannot afford this much audio.
+
+    Only cached data is used, so this never blocks on the network; a key with
+    no cached capabilities is always admitted.
+    """
+    entry = capabilities.peek(api_key)
+    if entry is None or entry.get('remaining') is None:
+        return
+    required = (audio_duration_ms / 60000) * units_per_minute
+    if entry['remaining'] <= 0 or required > entry['remaining']:
+        raise QuotaExceededError(
+            f"Job needs about {int(required)} quota units but the API key has {entry['remaining']} remaining"
         )
-        
-        if response.status_code == 200:
-            models = response.json()
-            logger.info(f"Available models: {models}")
-        else:
-            logger.warning(f"Could not retrieve models, status: {response.status_code}")
-            
-    except Exception as e:
-        logger.error(f"Error logging endpoints: {str(e)}")
 
 def check_scribe_access(api_key):
     """Check if the API key has access to Scribe."""
     try:
-        headers = {
-            'xi-api-key': api_key,
-            'Accept': 'application/json'
-        }
-        
-        # Check models to see if Scribe is available
-        response = requests.get(
-            'https://api.elevenlabs.io/v1/models',
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            logger.warning(f"Failed to retrieve models: {response.status_code}")
-            return False
-        
-        models_data = response.json()
-        logger.info(f"Available models: {models_data}")
-        
-        # Check if any of the models indicate Scribe/speech recognition capability
-        has_scribe = False
-        for model in models_data.get('models', []):
-            model_id = model.get('model_id', '').lower()
-            name = model.get('name', '').lower()
-            description = model.get('description', '').lower()
-            
-            if ('whisper' in model_id or 
-                'scribe' in model_id or 
-                'transcription' in name or 
-                'speech recognition' in description or
-                'speech-to-text' in description):
-                logger.info(f"Found speech recognition model: {model.get('name')}")
-                has_scribe = True
-                break
-        
-        return has_scribe
-        
+        return capabilities.get(api_key)['has_scribe']
     except Exception as e:
         logger.error(f"Error checking Scribe access: {str(e)}")
         return False
@@ -84,29 +151,10 @@ def check_scribe_access(api_key):
 def log_api_capabilities(api_key):
     """Log the API capabilities available to this key."""
     try:
-        headers = {
-            'xi-api-key': api_key,
-            'Accept': 'application/json'
-        }
-        
-        endpoints_to_test = [
-            'https://api.elevenlabs.io/v1/models',
-            'https://api.elevenlabs.io/v1/user',
-            'https://api.elevenlabs.io/v1/user/subscription',
-            'https://api.elevenlabs.io/v1/speech-to-text/models',
-            'https://api.elevenlabs.io/v1/audio-to-speech-text/models'
-        ]
-        
-        logger.info("Testing API endpoints accessibility:")
-        
-        for endpoint in endpoints_to_test:
-            try:
-                response = requests.get(endpoint, headers=headers)
-                logger.info(f"Endpoint {endpoint}: Status {response.status_code}")
-                if response.status_code == 200:
-                    logger.info(f"  Response keys: {list(response.json().keys()) if response.text else 'empty'}")
-            except Exception as e:
-                logger.warning(f"  Error testing {endpoint}: {str(e)}")
-        
+        entry = capabilities.get(api_key)
+        logger.info(
+            f"API key {hash_api_key(api_key)}: tier={entry['tier']}, scribe={entry['has_scribe']}, "
+            f"models={len(entry['models'])}, remaining={entry['remaining']}"
+        )
     except Exception as e:
-        logger.error(f"Error logging API capabilities: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Error logging API capabilities: {str(e)}")
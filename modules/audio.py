@@ -9,6 +9,7 @@ import traceback
 import subprocess
 import json
 from flask import current_app as app
+from modules.metrics import span
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,8 @@ def get_audio_duration(file_path):
             '-of', 'json', 
             file_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with span('ffprobe'):
+            result = subprocess.run(cmd, capture_output=True, text=True)
         data = json.loads(result.stdout)
         duration_sec = float(data['format']['duration'])
         return int(duration_sec * 1000)  # Convert to milliseconds
@@ -30,8 +32,67 @@ def get_audio_duration(file_path):
         logger.error(f"Error getting audio duration: {str(e)}")
         raise e
 
-def split_audio(file_path, segment_duration, overlap_duration, app_config=None):
-    """Split audio file into segments of specified duration with overlap using ffmpeg directly."""
+# Codecs the Scribe API accepts as uploaded, mapped to the extension used for stream-copied segments
+COPY_COMPATIBLE_CODECS = {
+    'mp3': '.mp3',
+    'aac': '.m4a',
+    'opus': '.ogg',
+}
+
+def get_audio_info(file_path):
+    """Get the duration and audio codec of a file using a single ffprobe call."""
+    try:
+        cmd = [
+            'ffprobe',
+            '-v', 'error',
+            '-select_streams', 'a:0',
+            '-show_entries', 'format=duration:stream=codec_name',
+            '-of', 'json',
+            file_path
+        ]
+        with span('ffprobe'):
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        data = json.loads(result.stdout)
+        duration_sec = float(data['format']['duration'])
+        streams = data.get('streams') or [{}]
+        return {
+            'duration': int(duration_sec * 1000),  # Convert to milliseconds
+            'codec': streams[0].get('codec_name')
+        }
+    except Exception as e:
+        logger.error(f"Error probing audio file: {str(e)}")
+        raise e
+
+def get_packet_start(file_path, position_ms):
+    """Return the timestamp (ms) of the audio packet a stream copy seeking to position_ms starts from."""
+    if position_ms <= 0:
+        return 0
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'a:0',
+        '-read_intervals', f"{position_ms / 1000}%+#1",
+        '-show_entries', 'packet=pts_time',
+        '-of', 'json',
+        file_path
+    ]
+    with span('ffprobe'):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        packets = json.loads(result.stdout).get('packets', [])
+        return int(round(float(packets[0]['pts_time']) * 1000))
+    except (ValueError, KeyError, IndexError, TypeError):
+        logger.warning(f"Could not locate packet boundary at {position_ms}ms, using requested time")
+        return position_ms
+
+def split_audio(file_path, segment_duration, overlap_duration, app_config=None, output_folder=None):
+    """Split audio file into segments of specified duration with overlap using ffmpeg directly.
+
+    When the source codec is already accepted by Scribe, segments are cut with
+    ``-c copy`` on packet boundaries and their start/end times are corrected to
+    the actual cut points; otherwise each segment is re-encoded to MP3.
+    Segments are written to output_folder (a job workspace) when given.
+    """
     try:
         # Check if ffmpeg is available
         try:
@@ -39,8 +100,15 @@ def split_audio(file_path, segment_duration, overlap_duration, app_config=None):
         except (subprocess.SubprocessError, FileNotFoundError):
             raise ImportError("FFmpeg is not installed or not in PATH. Please install FFmpeg.")
         
-        # Get duration of audio file
-        total_duration = get_audio_duration(file_path)
+        # Get duration and codec of audio file
+        audio_info = get_audio_info(file_path)
+        total_duration = audio_info['duration']
+        
+        # Use the stream-copy fast path when the codec can be sent to Scribe as-is
+        stream_copy = app_config.get('STREAM_COPY_SEGMENTS', True) if app_config else True
+        copy_extension = COPY_COMPATIBLE_CODECS.get(audio_info['codec']) if stream_copy else None
+        if copy_extension:
+            logger.info(f"Source codec {audio_info['codec']} is Scribe-compatible, cutting segments with stream copy")
         
         # Calculate number of segments
         effective_segment = segment_duration - overlap_duration  # Adjust for overlap
@@ -48,8 +116,8 @@ def split_audio(file_path, segment_duration, overlap_duration, app_config=None):
         
         logger.info(f"Splitting audio file of {total_duration}ms into {num_segments} segments with {overlap_duration}ms overlap")
         
-        # Determine upload folder - use provided config or fallback
-        upload_folder = app_config.get('UPLOAD_FOLDER') if app_config else 'uploads'
+        # Determine output folder - use the job workspace, provided config or fallback
+        upload_folder = output_folder or (app_config.get('UPLOAD_FOLDER') if app_config else 'uploads')
         
         segments = []
         for i in range(num_segments):
@@ -62,27 +130,49 @@ def split_audio(file_path, segment_duration, overlap_duration, app_config=None):
             if i > 0:
                 start = max(0, start - overlap_duration)
             
+            if copy_extension:
+                # Stream copy can only cut on packet boundaries, so record the real cut point
+                start = get_packet_start(file_path, start)
+            
             # Convert milliseconds to seconds for ffmpeg
             start_sec = start / 1000
             duration_sec = (end - start) / 1000
             
             # Generate unique filename
-            segment_filename = f"segment_{i}_{uuid.uuid4()}.mp3"
+            segment_filename = f"segment_{i}_{uuid.uuid4()}{copy_extension or '.mp3'}"
             segment_path = os.path.join(upload_folder, segment_filename)
             
-            # Use ffmpeg to extract segment
-            cmd = [
-                'ffmpeg',
-                '-y',  # Overwrite output files
-                '-i', file_path,  # Input file
-                '-ss', str(start_sec),  # Start time
-                '-t', str(duration_sec),  # Duration
-                '-acodec', 'libmp3lame',  # MP3 codec
-                '-q:a', '2',  # Quality
-                segment_path  # Output file
-            ]
+            if copy_extension:
+                # Seek on the input and copy packets without decoding
+                cmd = [
+                    'ffmpeg',
+                    '-y',  # Overwrite output files
+                    '-ss', str(start_sec),  # Start time
+                    '-i', file_path,  # Input file
+                    '-t', str(duration_sec),  # Duration
+                    '-map', '0:a:0',  # Audio stream only
+                    '-c', 'copy',  # No re-encoding
+                    segment_path  # Output file
+                ]
+            else:
+                # Use ffmpeg to extract and re-encode segment
+                cmd = [
+                    'ffmpeg',
+                    '-y',  # Overwrite output files
+                    '-i', file_path,  # Input file
+                    '-ss', str(start_sec),  # Start time
+                    '-t', str(duration_sec),  # Duration
+                    '-acodec', 'libmp3lame',  # MP3 codec
+                    '-q:a', '2',  # Quality
+                    segment_path  # Output file
+                ]
+            
+            with span('segment_copy' if copy_extension else 'segment_encode'):
+                subprocess.run(cmd, capture_output=True, check=True)
             
-            subprocess.run(cmd, capture_output=True, check=True)
+            if copy_extension:
+                # The copied segment ends on a packet boundary as well
+                end = min(start + get_audio_duration(segment_path), total_duration)
             
             # Store segment information
             segments.append({
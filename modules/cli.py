@@ -0,0 +1,292 @@
+"""
+Headless batch transcription.
+Transcribes every recording in a directory without the web UI:
+
+    python -m modules.cli transcribe recordings/ --concurrency 8
+
+Files are split one after another and their segments are fed into a single
+shared pool of API workers, so the pool stays busy across file boundaries.
+Each finished file is written as <name>.json in the output directory (or
+<name>.<ext>.json when two recordings share a name); files whose output already
+exists are skipped. Files with segments that could not be transcribed are
+written as <name>.partial.json instead, so the next run tries them again.
+
+With --key-pool, segments are spread over the keys configured in API_KEY_POOL
+or API_KEY_POOL_FILE instead of a single --api-key.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SEGMENT_DURATION, OVERLAP_DURATION
+from modules.audio import split_audio
+from modules.key_pool import get_key_pool
+from modules.transcription import transcribe_segment_with_requests, merge_transcriptions
+from modules.worker import get_worker_config
+from modules.workspace import JobWorkspace
+
+logger = logging.getLogger(__name__)
+
+# Recordings split and in flight at once: the next file is split while the last one's segments finish
+MAX_OPEN_FILES = 2
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.aac', '.ogg', '.opus', '.flac', '.webm', '.mp4')
+
+def output_paths(audio_paths, output_dir=None):
+    """Map each recording to its output, <name>.json, or <name>.<ext>.json when another recording would write the same file."""
+    def output_dir_for(audio_path):
+        return output_dir or os.path.dirname(audio_path)
+    plain = {
+        audio_path: os.path.join(output_dir_for(audio_path), os.path.splitext(os.path.basename(audio_path))[0] + '.json')
+        for audio_path in audio_paths
+    }
+    counts = Counter(plain.values())
+    return {
+        audio_path: path if counts[path] == 1 else os.path.join(output_dir_for(audio_path), os.path.basename(audio_path) + '.json')
+        for audio_path, path in plain.items()
+    }
+
+def partial_path_for(output_path):
+    return output_path[:-len('.json')] + '.partial.json'
+
+def find_recordings(directory, extensions=AUDIO_EXTENSIONS):
+    """Return the audio files directly inside directory, sorted by name."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(extensions) and os.path.isfile(os.path.join(directory, name))
+    )
+
+def write_json_atomic(path, payload):
+    # Write then rename, so an interrupted run never leaves an output that looks finished
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+class BatchFile:
+    """Segments of one recording in flight, merged and written when the last one finishes."""
+
+    def __init__(self, audio_path, output_path, segments, workspace, started):
+        self.audio_path = audio_path
+        self.output_path = output_path
+        self.segments = segments
+        self.workspace = workspace
+        self.started = started
+        self.results = [None] * len(segments)
+        self.remaining = len(segments)
+        self._lock = threading.Lock()
+
+    def segment_done(self, position, transcript):
+        """Record a segment's transcript, returning True when it was the file's last one."""
+        with self._lock:
+            self.results[position] = transcript
+            self.remaining -= 1
+            return self.remaining == 0
+
+class BatchTranscriber:
+    """Transcribes many recordings through one shared pool of segment workers."""
+
+    def __init__(self, api_key, concurrency=4, output_dir=None, enable_diarization=True,
+                 num_speakers='', model_id='scribe_v1', app_config=None, emit=None, key_pool=None):
+        self.api_key = api_key
+        self.key_pool = key_pool
+        self.concurrency = concurrency
+        self.output_dir = output_dir
+        self.enable_diarization = enable_diarization
+        self.num_speakers = num_speakers
+        self.model_id = model_id
+        self.app_config = app_config or get_worker_config()
+        self.emit = emit or (lambda record: None)
+        self.results = []
+        # Bounds how far splitting runs ahead of the API workers, limiting scratch usage
+        self._in_flight = threading.BoundedSemaphore(concurrency * 2)
+        self._open_files = threading.BoundedSemaphore(MAX_OPEN_FILES)
+        self._results_lock = threading.Lock()
+
+    def run(self, audio_paths, outputs=None):
+        """Transcribe audio_paths, returning one result record per file.
+
+        outputs maps each recording to its output path (default: output_paths).
+        """
+        outputs = outputs or output_paths(audio_paths, self.output_dir)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='segment') as pool:
+            for audio_path in audio_paths:
+                self._schedule(pool, audio_path, outputs[audio_path])
+        return self.results
+
+    def _record(self, record):
+        with self._results_lock:
+            self.results.append(record)
+        self.emit(record)
+
+    def _schedule(self, pool, audio_path, output_path):
+        # Only a few recordings are split to scratch at a time; a slot frees up when a file finishes
+        self._open_files.acquire()
+        started = time.perf_counter()
+        workspace = JobWorkspace(f"cli_{uuid.uuid4()}", self.app_config, required_bytes=os.path.getsize(audio_path))
+        batch_file = None
+        try:
+            workspace.open()
+            segments = split_audio(
+                audio_path,
+                SEGMENT_DURATION,
+                OVERLAP_DURATION,
+                app_config=self.app_config,
+                output_folder=workspace.path
+            )
+            if not segments:
+                raise ValueError('no audio segments were produced')
+            batch_file = BatchFile(audio_path, output_path, segments, workspace, started)
+        except Exception as e:
+            logger.error(f"Failed to split {audio_path}: {str(e)}")
+            self._record({'file': audio_path, 'status': 'error', 'error': f'Error splitting audio: {str(e)}'})
+        finally:
+            # Once segments are queued, the workspace and slot are released by _finish
+            if batch_file is None:
+                workspace.close()
+                self._open_files.release()
+        if batch_file is None:
+            return
+
+        logger.info(f"Queued {len(segments)} segment(s) of {audio_path}")
+        for position in range(len(segments)):
+            self._in_flight.acquire()
+            pool.submit(self._transcribe_segment, batch_file, position)
+
+    def _transcribe_segment(self, batch_file, position):
+        segment = batch_file.segments[position]
+        try:
+            if self.key_pool is not None:
+                transcript = self.key_pool.transcribe(
+                    segment['path'],
+                    self.enable_diarization,
+                    self.num_speakers,
+                    self.model_id,
+                    audio_ms=segment['end_time'] - segment['start_time']
+                )
+            else:
+                transcript = transcribe_segment_with_requests(
+                    segment['path'],
+                    self.api_key,
+                    self.enable_diarization,
+                    self.num_speakers,
+                    self.model_id
+                )
+        except Exception as e:
+            logger.error(f"Error transcribing {segment['path']}: {str(e)}")
+            transcript = []
+        finally:
+            self._in_flight.release()
+            try:
+                os.remove(segment['path'])
+            except OSError:
+                pass
+
+        if batch_file.segment_done(position, transcript):
+            self._finish(batch_file)
+
+    def _finish(self, batch_file):
+        try:
+            # Default speaker labels; merge_transcriptions maps speakers across segments
+            transcript = merge_transcriptions(batch_file.results, {}, batch_file.segments)
+            empty_segments = [segment['index'] for segment, result in zip(batch_file.segments, batch_file.results) if not result]
+            # Incomplete transcripts are kept aside so the next run doesn't skip the file
+            partial_path = partial_path_for(batch_file.output_path)
+            output_path = partial_path if empty_segments else batch_file.output_path
+            write_json_atomic(output_path, {
+                'source': os.path.abspath(batch_file.audio_path),
+                'model_id': self.model_id,
+                'duration_ms': batch_file.segments[-1]['end_time'],
+                'segments': len(batch_file.segments),
+                'empty_segments': empty_segments,
+                'transcript': transcript
+            })
+            if not empty_segments and os.path.exists(partial_path):
+                os.remove(partial_path)
+            self._record({
+                'file': batch_file.audio_path,
+                'status': 'ok' if not empty_segments else 'partial',
+                'output': output_path,
+                'segments': len(batch_file.segments),
+                'empty_segments': len(empty_segments),
+                'entries': len(transcript),
+                'seconds': round(time.perf_counter() - batch_file.started, 2)
+            })
+        except Exception as e:
+            logger.error(f"Failed to write {batch_file.output_path}: {str(e)}")
+            self._record({'file': batch_file.audio_path, 'status': 'error', 'error': str(e)})
+        finally:
+            batch_file.workspace.close()
+            self._open_files.release()
+
+def transcribe_command(args):
+    api_key = args.api_key or os.environ.get('ELEVENLABS_API_KEY')
+    key_pool = None
+    if args.key_pool:
+        key_pool = get_key_pool(get_worker_config())
+        if key_pool is None:
+            print('--key-pool needs keys in API_KEY_POOL or API_KEY_POOL_FILE', file=sys.stderr)
+            return 2
+    elif not api_key:
+        print('An API key is required (--api-key, ELEVENLABS_API_KEY or --key-pool)', file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.directory):
+        print(f'Not a directory: {args.directory}', file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    def emit(record):
+        print(json.dumps(record), flush=True)
+
+    pending = []
+    outputs = output_paths(find_recordings(args.directory), args.output_dir)
+    for audio_path, output_path in outputs.items():
+        if os.path.exists(output_path) and not args.force:
+            emit({'file': audio_path, 'status': 'skipped', 'output': output_path})
+        else:
+            pending.append(audio_path)
+
+    transcriber = BatchTranscriber(
+        api_key,
+        # Pooled keys are each limited by the pool, so by default use all of their slots
+        concurrency=args.concurrency or (key_pool.capacity if key_pool else 4),
+        output_dir=args.output_dir,
+        enable_diarization=not args.no_diarization,
+        num_speakers=args.num_speakers,
+        model_id=args.model_id,
+        emit=emit,
+        key_pool=key_pool
+    )
+    results = transcriber.run(pending, outputs)
+    # Files left partial count as failures, so scripted runs know to run again
+    return 1 if any(result['status'] in ('error', 'partial') for result in results) else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Transcribe recordings without the web UI.')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    transcribe = subcommands.add_parser('transcribe', help='transcribe every recording in a directory')
+    transcribe.add_argument('directory', help='directory of audio files')
+    transcribe.add_argument('--concurrency', type=int, help='segments transcribed at once, across all files (default: 4, or the key pool capacity)')
+    transcribe.add_argument('--output-dir', help='where to write <name>.json (default: next to each recording)')
+    transcribe.add_argument('--api-key', help='ElevenLabs API key (default: $ELEVENLABS_API_KEY)')
+    transcribe.add_argument('--key-pool', action='store_true', help='spread segments over the configured API key pool')
+    transcribe.add_argument('--model-id', default='scribe_v1')
+    transcribe.add_argument('--num-speakers', default='', help='expected number of speakers')
+    transcribe.add_argument('--no-diarization', action='store_true', help='disable speaker diarization')
+    transcribe.add_argument('--force', action='store_true', help='re-transcribe files whose output already exists')
+    transcribe.set_defaults(handler=transcribe_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Streaming transcript export.
+Each format is a generator that formats transcript entries (with `start`/`end`
+in milliseconds) a batch at a time, so a long transcript is never rendered into
+one string before it is sent.
+"""
+import json
+import re
+
+# Entries formatted per chunk sent to the client
+EXPORT_CHUNK_ENTRIES = 200
+
+def speaker_name(speaker):
+    """Render raw diarization ids ('0', 'speaker_1') as 'Speaker N', leaving custom labels alone."""
+    speaker = str(speaker)
+    if re.fullmatch(r'(speaker_?)?[0-9]+', speaker, re.IGNORECASE):
+        return f"Speaker {re.sub(r'^speaker_?', '', speaker, flags=re.IGNORECASE)}"
+    return speaker
+
+def format_timestamp(ms, separator='.'):
+    """Format milliseconds as HH:MM:SS.mmm (SRT uses ',' as the separator, None drops the ms)."""
+    ms = max(0, int(round(ms or 0)))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    if separator is None:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+def _chunked(lines):
+    # Join formatted entries into chunks so the response isn't one write per line
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= EXPORT_CHUNK_ENTRIES:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def _cue_end(entry):
+    # Subtitle cues need a positive duration even when the API gave no end time
+    return max(entry.get('end', 0), entry.get('start', 0) + 1)
+
+def iter_srt(entries):
+    def cues():
+        for number, entry in enumerate(entries, start=1):
+            yield (
+                f"{number}\n"
+                f"{format_timestamp(entry.get('start', 0), ',')} --> {format_timestamp(_cue_end(entry), ',')}\n"
+                f"{speaker_name(entry.get('speaker', ''))}: {entry.get('text', '')}\n\n"
+            )
+    yield from _chunked(cues())
+
+def _escape_vtt(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def iter_vtt(entries):
+    def cues():
+        yield "WEBVTT\n\n"
+        for entry in entries:
+            yield (
+                f"{format_timestamp(entry.get('start', 0))} --> {format_timestamp(_cue_end(entry))}\n"
+                f"<v {_escape_vtt(speaker_name(entry.get('speaker', '')))}>{_escape_vtt(entry.get('text', ''))}\n\n"
+            )
+    yield from _chunked(cues())
+
+def iter_jsonl(entries):
+    def lines():
+        for entry in entries:
+            yield json.dumps({
+                'start': entry.get('start', 0),
+                'end': entry.get('end', 0),
+                'speaker': speaker_name(entry.get('speaker', '')),
+                'text': entry.get('text', '')
+            }, ensure_ascii=False) + '\n'
+    yield from _chunked(lines())
+
+def iter_text(entries):
+    def paragraphs():
+        current_speaker = None
+        for entry in entries:
+            speaker = speaker_name(entry.get('speaker', ''))
+            # Start a new paragraph with a timestamp at each change of speaker
+            if speaker != current_speaker:
+                prefix = '\n' if current_speaker is not None else ''
+                current_speaker = speaker
+                yield f"{prefix}[{format_timestamp(entry.get('start', 0), None)}] {speaker}:\n"
+            yield f"{entry.get('text', '')}\n"
+    yield from _chunked(paragraphs())
+
+# Format name -> (generator, mimetype, file extension)
+EXPORT_FORMATS = {
+    'srt': (iter_srt, 'application/x-subrip', 'srt'),
+    'vtt': (iter_vtt, 'text/vtt', 'vtt'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson', 'jsonl'),
+    'txt': (iter_text, 'text/plain', 'txt'),
+}
@@ -0,0 +1,319 @@
+"""
+Audio fingerprinting for reusing transcripts of repeated audio.
+Recordings are decoded to low-rate PCM through an FFmpeg pipe and reduced to
+32-bit hashes of how loudness rises and falls, one every FINGERPRINT_HOP_MS.
+The hashes don't depend on where a file was trimmed, so a segment of a new
+recording can be matched to audio an API key has already paid to transcribe,
+wherever it sits in the old recording. Matches are only made within one key.
+"""
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+
+from config import FINGERPRINT_DB_PATH, FINGERPRINT_MAX_AGE
+from modules.transcription import map_segment_speakers
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_SAMPLE_RATE = 8000
+# Energy is measured over 25 ms sub-frames and compared across 100 ms windows
+SUBFRAME_SAMPLES = 200
+FINGERPRINT_HOP_MS = 1000 * SUBFRAME_SAMPLES // FINGERPRINT_SAMPLE_RATE
+WINDOW_SUBFRAMES = 4
+HASH_BITS = 32
+
+# Windows quieter than this mean absolute amplitude carry no usable shape
+SILENCE_LEVEL = 30
+
+# Every LOOKUP_STRIDE-th hash of a new recording is looked up to find alignments
+LOOKUP_STRIDE = 8
+LOOKUP_LIMIT = 20
+MIN_ALIGNMENT_VOTES = 20
+
+# A frame matches when its hashes differ in at most this many bits...
+MAX_BIT_ERRORS = 6
+# ...and a segment is reused when, in every audible one-second block, this share of frames match
+BLOCK_FRAMES = 40
+MIN_MATCH_RATIO = 0.75
+# Segments that are mostly silence carry too little to match on
+MIN_COMPARED_RATIO = 0.5
+
+# Matched sources kept decoded in memory per process (each holds a recording's hashes and transcript)
+SOURCE_CACHE_SIZE = 8
+
+class FingerprintCancelledError(Exception):
+    """Raised when fingerprinting is stopped before the recording was fully decoded."""
+
+def compute_fingerprint(file_path, cancel=None):
+    """Decode a recording through FFmpeg and return its hashes (0 where the audio is silent).
+
+    Setting the `cancel` event stops the decoder and raises FingerprintCancelledError.
+    """
+    process = subprocess.Popen(
+        [
+            'ffmpeg', '-v', 'error', '-i', file_path,
+            '-ac', '1', '-ar', str(FINGERPRINT_SAMPLE_RATE), '-f', 's16le', '-'
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    hashes = array('I')
+    subframes = []  # recent sub-frame energies
+    windows = []  # recent window energies
+    bits = 0
+    chunk_bytes = SUBFRAME_SAMPLES * 2 * 256
+    pending = b''
+    cancelled = False
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                process.kill()
+                break
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            pending += chunk
+            usable = len(pending) - len(pending) % (SUBFRAME_SAMPLES * 2)
+            samples = array('h', pending[:usable])
+            pending = pending[usable:]
+            if sys.byteorder == 'big':
+                samples.byteswap()
+
+            for offset in range(0, len(samples), SUBFRAME_SAMPLES):
+                subframes.append(sum(map(abs, samples[offset:offset + SUBFRAME_SAMPLES])))
+                if len(subframes) > WINDOW_SUBFRAMES:
+                    subframes.pop(0)
+                windows.append(sum(subframes))
+                if len(windows) > WINDOW_SUBFRAMES + 1:
+                    windows.pop(0)
+
+                # One bit per hop: is this window louder than the one just before it?
+                louder = len(windows) > WINDOW_SUBFRAMES and windows[-1] > windows[0]
+                bits = ((bits << 1) | louder) & 0xFFFFFFFF
+                audible = windows[-1] >= SILENCE_LEVEL * SUBFRAME_SAMPLES * len(subframes)
+                ready = len(hashes) >= HASH_BITS + WINDOW_SUBFRAMES
+                hashes.append(bits if audible and ready else 0)
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if cancelled:
+        raise FingerprintCancelledError(f"Fingerprinting of {file_path} was cancelled")
+    if returncode != 0:
+        raise RuntimeError(f"FFmpeg could not decode {file_path} for fingerprinting (exit code {returncode})")
+    return hashes
+
+def _bit_errors(a, b):
+    return bin(a ^ b).count('1')
+
+def source_utterances(segments, segment_transcriptions):
+    """Flatten a finished job's segment transcripts onto one timeline with first-segment speaker ids.
+
+    Each moment is taken from one segment only (overlaps go to the later
+    segment), and the time ranges of segments that returned nothing are left
+    out of `trusted`, so failed API calls are never reused as silence.
+    """
+    first_speakers = sorted(set(item.get('speaker', 'Unknown') for item in segment_transcriptions[0] or []))
+    utterances = []
+    trusted = []
+    for idx, (segment, items) in enumerate(zip(segments, segment_transcriptions)):
+        items = items or []
+        end = segments[idx + 1]['start_time'] if idx + 1 < len(segments) else segment['end_time']
+        speakers = sorted(set(item.get('speaker', 'Unknown') for item in items))
+        mapping = {} if idx == 0 else map_segment_speakers(speakers, first_speakers)
+        for item in items:
+            start = segment['start_time'] + item.get('start', 0) * 1000
+            if start < end:
+                utterances.append({
+                    'text': item.get('text', ''),
+                    'speaker': mapping.get(item.get('speaker', 'Unknown'), item.get('speaker', 'Unknown')),
+                    'start': start,
+                    'end': segment['start_time'] + item.get('end', 0) * 1000
+                })
+        if items:
+            if trusted and trusted[-1][1] >= segment['start_time']:
+                trusted[-1][1] = end
+            else:
+                trusted.append([segment['start_time'], end])
+    utterances.sort(key=lambda u: u['start'])
+    return utterances, trusted
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id TEXT PRIMARY KEY,
+    key_hash TEXT NOT NULL,
+    hashes BLOB NOT NULL,
+    utterances TEXT NOT NULL,
+    trusted TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprint_hashes (
+    key_hash TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    source_id TEXT NOT NULL,
+    frame INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprint_hashes_lookup ON fingerprint_hashes (key_hash, hash);
+CREATE INDEX IF NOT EXISTS fingerprint_hashes_source ON fingerprint_hashes (source_id);
+"""
+
+class FingerprintStore:
+    """Fingerprints and transcripts of finished recordings, in a SQLite database."""
+
+    def __init__(self, path, max_age=FINGERPRINT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        # Recently matched sources, LRU: source id -> (hashes, utterances, trusted); sources are immutable
+        self._sources = OrderedDict()
+        self._sources_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The schema is created on a connection of its own, so none is left open in a
+        # server process that forks its workers afterwards
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared across threads, nor used on both sides of a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add_source(self, source_id, key_hash, hashes, utterances, trusted):
+        """Store a transcribed recording, dropping sources older than max_age."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = [row[0] for row in conn.execute(
+                'SELECT id FROM sources WHERE created < ?', (time.time() - self.max_age,)
+            )]
+            for expired_id in expired:
+                conn.execute('DELETE FROM fingerprint_hashes WHERE source_id = ?', (expired_id,))
+                conn.execute('DELETE FROM sources WHERE id = ?', (expired_id,))
+            conn.execute(
+                'INSERT OR REPLACE INTO sources (id, key_hash, hashes, utterances, trusted, created) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (source_id, key_hash, hashes.tobytes(), json.dumps(utterances), json.dumps(trusted), time.time())
+            )
+            conn.executemany(
+                'INSERT INTO fingerprint_hashes (key_hash, hash, source_id, frame) VALUES (?, ?, ?, ?)',
+                ((key_hash, value, source_id, frame) for frame, value in enumerate(hashes) if value)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def lookup(self, key_hash, value, limit=LOOKUP_LIMIT):
+        return self._connect().execute(
+            'SELECT source_id, frame FROM fingerprint_hashes WHERE key_hash = ? AND hash = ? LIMIT ?',
+            (key_hash, value, limit)
+        ).fetchall()
+
+    def load_source(self, source_id):
+        with self._sources_lock:
+            source = self._sources.get(source_id)
+            if source is not None:
+                self._sources.move_to_end(source_id)
+                return source
+        row = self._connect().execute(
+            'SELECT hashes, utterances, trusted FROM sources WHERE id = ?', (source_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        hashes = array('I')
+        hashes.frombytes(row[0])
+        source = (hashes, json.loads(row[1]), json.loads(row[2]))
+        with self._sources_lock:
+            self._sources[source_id] = source
+            while len(self._sources) > SOURCE_CACHE_SIZE:
+                self._sources.popitem(last=False)
+        return source
+
+def find_alignments(store, key_hash, hashes):
+    """Return (source id, frame offset) pairs that many sampled hashes agree on, best first."""
+    votes = Counter()
+    for frame in range(0, len(hashes), LOOKUP_STRIDE):
+        if hashes[frame]:
+            for source_id, source_frame in store.lookup(key_hash, hashes[frame]):
+                votes[(source_id, source_frame - frame)] += 1
+    return [alignment for alignment, count in votes.most_common(5) if count >= MIN_ALIGNMENT_VOTES]
+
+def _segment_matches(hashes, source_hashes, first, last, offset):
+    # Checked block by block, so a few seconds of different audio can't hide in a long segment.
+    # Audio on only one side counts against the match: it may be speech the other lacks.
+    total_compared = 0
+    for block in range(first, last, BLOCK_FRAMES):
+        compared = matched = 0
+        for frame in range(block, min(last, block + BLOCK_FRAMES)):
+            a = hashes[frame] if frame < len(hashes) else 0
+            source_frame = frame + offset
+            b = source_hashes[source_frame] if 0 <= source_frame < len(source_hashes) else 0
+            if a or b:
+                compared += 1
+                matched += bool(a and b) and _bit_errors(a, b) <= MAX_BIT_ERRORS
+        if matched < MIN_MATCH_RATIO * compared:
+            return False
+        total_compared += compared
+    return total_compared >= MIN_COMPARED_RATIO * max(1, last - first)
+
+def find_reusable_segments(store, key_hash, hashes, segments):
+    """Map segment index -> transcript items (segment-relative, like API results) for segments
+    whose whole time range was already transcribed for this key."""
+    reusable = {}
+    alignments = find_alignments(store, key_hash, hashes)
+    for segment in segments:
+        first = segment['start_time'] // FINGERPRINT_HOP_MS
+        last = segment['end_time'] // FINGERPRINT_HOP_MS
+        for source_id, offset in alignments:
+            source = store.load_source(source_id)
+            if source is None:
+                continue
+            source_hashes, utterances, trusted = source
+            offset_ms = offset * FINGERPRINT_HOP_MS
+            start, end = segment['start_time'] + offset_ms, segment['end_time'] + offset_ms
+            if not any(low <= start and end <= high for low, high in trusted):
+                continue
+            if not _segment_matches(hashes, source_hashes, first, last, offset):
+                continue
+            reusable[segment['index']] = [
+                {
+                    'text': u['text'],
+                    'speaker': u['speaker'],
+                    'start': (u['start'] - start) / 1000,
+                    'end': (min(u['end'], end) - start) / 1000
+                }
+                for u in utterances if start <= u['start'] < end
+            ]
+            logger.info(f"Segment {segment['index']} matches source {source_id} at offset {offset_ms}ms, reusing its transcript")
+            break
+    return reusable
+
+# One store per database path, shared by every job in the process
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_fingerprint_store(app_config=None):
+    """Return the shared store for the configured FINGERPRINT_DB_PATH."""
+    app_config = app_config or {}
+    path = app_config.get('FINGERPRINT_DB_PATH', FINGERPRINT_DB_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FingerprintStore(path, max_age=app_config.get('FINGERPRINT_MAX_AGE', FINGERPRINT_MAX_AGE))
+        return _stores[path]
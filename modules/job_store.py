@@ -0,0 +1,423 @@
+"""
+SQLite-backed job store and queue.
+Lets the web server hand jobs to separate worker processes (see modules.worker)
+that share the same database file and upload folder.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from modules.jobs import QueueFullError, hash_api_key
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the API key inside stored job arguments
+API_KEY_PLACEHOLDER = '__api_key__'
+
+# Claim order: cheap label processing first, then the least recently served API key
+CLAIM_ORDER = (
+    "ORDER BY q.kind = 'process' DESC, "
+    "(SELECT COALESCE(MAX(r.claimed_at), 0) FROM queue r WHERE r.key_hash = q.key_hash), "
+    "q.enqueued"
+)
+
+# Finished queue entries are kept this long so key fairness remembers recent claims
+FINISHED_RETENTION = 24 * 60 * 60
+
+# Running entries whose worker has not renewed its lease for this long are requeued
+LEASE_SECONDS = 120
+
+# Claims allowed per queue entry before a job whose workers keep dying is failed
+MAX_CLAIMS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_records (
+    id TEXT PRIMARY KEY,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_fields (
+    job_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (job_id, field)
+);
+CREATE TABLE IF NOT EXISTS queue (
+    id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    api_key TEXT,
+    key_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    enqueued REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    heartbeat REAL,
+    claims INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queue_status ON queue (status, enqueued);
+CREATE INDEX IF NOT EXISTS queue_job ON queue (job_id);
+CREATE TABLE IF NOT EXISTS transcript_terms (
+    term TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    entry INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcript_terms_term ON transcript_terms (term, job_id);
+CREATE INDEX IF NOT EXISTS transcript_terms_word ON transcript_terms (job_id, entry, position);
+"""
+
+# Queue columns added after the first release, created on databases that predate them
+QUEUE_MIGRATIONS = {
+    'heartbeat': 'ALTER TABLE queue ADD COLUMN heartbeat REAL',
+    'claims': 'ALTER TABLE queue ADD COLUMN claims INTEGER NOT NULL DEFAULT 0'
+}
+
+_MISSING = object()
+
+class StoredJob(dict):
+    """Job record that writes fields back to the store as they are set.
+
+    Only the fields being set are written, so progress updates stay cheap on
+    jobs with long transcripts and never overwrite fields another process wrote.
+    """
+
+    def __init__(self, store, *args, version=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._store = store
+        # When the record was last written, so cached responses can tell it changed
+        self.version = version
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version = self._store.save_fields(self['id'], {key: value})
+        if key == 'transcript_index':
+            self._store.save_terms(self)
+
+    def update(self, *args, **kwargs):
+        fields = dict(*args, **kwargs)
+        super().update(fields)
+        self.version = self._store.save_fields(self['id'], fields)
+        if 'transcript_index' in fields:
+            self._store.save_terms(self)
+
+    def fetch(self, key, default=None):
+        """Return a field, reading it from the store if this record was loaded without it."""
+        if key not in self:
+            value = self._store.get_field(self['id'], key, _MISSING)
+            if value is _MISSING:
+                return default
+            super().__setitem__(key, value)
+        return self[key]
+
+    def pop(self, key, *default):
+        """Remove a field and return its value, atomically across every process sharing the store."""
+        super().pop(key, None)
+        found, value = self._store.take_field(self['id'], key)
+        if not found:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return value
+
+    def reload(self):
+        """Re-read this record from the store, picking up writes made by other processes."""
+        fresh = self._store.get(self['id'])
+        if fresh is not None:
+            super().clear()
+            super().update(fresh)
+            self.version = fresh.version
+
+class SQLiteJobStore:
+    """Job records and a fair, bounded job queue in a single SQLite database."""
+
+    def __init__(self, path, max_queued=20, max_queued_per_key=5, max_running=None):
+        self.path = path
+        self.max_queued = max_queued
+        self.max_queued_per_key = max_queued_per_key
+        # Transcription jobs running at once across every process sharing the database (None: no cap)
+        self.max_running = max_running
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The schema is created on a connection of its own, so none is left open in a
+        # server process that forks its workers afterwards
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(queue)')}
+            for column, statement in QUEUE_MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared across threads, nor used on both sides of a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Job records
+
+    def add(self, job):
+        self.save(job)
+        return self.get(job['id'])
+
+    def save(self, job):
+        """Write every field of a job record, returning its new version (the time it was written)."""
+        return self.save_fields(job['id'], job)
+
+    def save_fields(self, job_id, fields):
+        """Write the given fields of a job record, returning its new version."""
+        updated = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO job_records (id, updated) VALUES (?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET updated = excluded.updated',
+                (job_id, updated)
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO job_fields (job_id, field, value) VALUES (?, ?, ?)',
+                ((job_id, field, json.dumps(value)) for field, value in dict(fields).items())
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return updated
+
+    def take_field(self, job_id, field):
+        """Delete a field of a job record, returning (found, value); only one caller can take a given write."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value FROM job_fields WHERE job_id = ? AND field = ?', (job_id, field)
+            ).fetchone()
+            if row is not None:
+                conn.execute('DELETE FROM job_fields WHERE job_id = ? AND field = ?', (job_id, field))
+                conn.execute('UPDATE job_records SET updated = ? WHERE id = ?', (time.time(), job_id))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return (True, json.loads(row[0])) if row is not None else (False, None)
+
+    def _load(self, job_id, updated, fields=None):
+        query = 'SELECT field, value FROM job_fields WHERE job_id = ?'
+        params = [job_id]
+        if fields is not None:
+            query += f" AND field IN ({', '.join('?' * len(fields))})"
+            params.extend(fields)
+        rows = self._connect().execute(query, params)
+        job = StoredJob(self, {field: json.loads(value) for field, value in rows}, version=updated)
+        # id is the record's key, so it is there even when not asked for
+        dict.__setitem__(job, 'id', job_id)
+        return job
+
+    def get(self, job_id, fields=None):
+        """Return a job record, or only the given fields of it (others can be read with fetch())."""
+        row = self._connect().execute('SELECT id, updated FROM job_records WHERE id = ?', (job_id,)).fetchone()
+        return self._load(*row, fields) if row else None
+
+    def latest(self, fields=None):
+        row = self._connect().execute('SELECT id, updated FROM job_records ORDER BY rowid DESC LIMIT 1').fetchone()
+        return self._load(*row, fields) if row else None
+
+    def get_field(self, job_id, field, default=None):
+        row = self._connect().execute(
+            'SELECT value FROM job_fields WHERE job_id = ? AND field = ?', (job_id, field)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def active(self):
+        """Return the records of jobs with queue entries still waiting or running."""
+        rows = self._connect().execute(
+            "SELECT DISTINCT j.id, j.updated FROM job_records j JOIN queue q ON q.job_id = j.id "
+            "WHERE q.status IN ('queued', 'running')"
+        ).fetchall()
+        return [self._load(job_id, updated) for job_id, updated in rows]
+
+    # Transcript search
+
+    def save_terms(self, job):
+        """Replace a job's rows in the cross-job term table with its current transcript index."""
+        from modules.transcript_index import iter_terms
+        index = job.get('transcript_index')
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM transcript_terms WHERE job_id = ?', (job['id'],))
+            if index:
+                conn.executemany(
+                    'INSERT INTO transcript_terms (term, job_id, entry, position, time) VALUES (?, ?, ?, ?, ?)',
+                    ((term, job['id'], entry, position, time)
+                     for term, entry, position, time in iter_terms(index, job['final_transcript']))
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def search(self, query, limit=50):
+        """Find a phrase across every stored job's transcript, newest job first."""
+        from modules.transcript_index import tokenize
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # One self-join per following word keeps matching on the (job, entry, position) index
+        joins = ''.join(
+            f' JOIN transcript_terms t{i} ON t{i}.job_id = t0.job_id AND t{i}.entry = t0.entry'
+            f' AND t{i}.position = t0.position + {i} AND t{i}.term = ?'
+            for i in range(1, len(terms))
+        )
+        rows = self._connect().execute(
+            'SELECT t0.job_id, t0.entry, t0.position, t0.time FROM transcript_terms t0' + joins
+            + ' JOIN job_records j ON j.id = t0.job_id WHERE t0.term = ?'
+            + ' ORDER BY j.updated DESC, t0.entry, t0.position LIMIT ?',
+            (*terms[1:], terms[0], limit)
+        ).fetchall()
+        return [
+            {'job_id': job_id, 'entry': entry, 'position': position, 'time': round(time)}
+            for job_id, entry, position, time in rows
+        ]
+
+    # Queue
+
+    def submit(self, job_id, api_key, kind, args):
+        """Queue a job for a worker process, raising QueueFullError when admission is refused."""
+        key_hash = hash_api_key(api_key)
+        # The key is stored in its own column so it can be dropped once the job has finished
+        args = [API_KEY_PLACEHOLDER if arg == api_key else arg for arg in args]
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            queued = conn.execute("SELECT COUNT(*) FROM queue WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+            per_key = conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE status = 'queued' AND key_hash = ?", (key_hash,)
+            ).fetchone()[0]
+            if per_key >= self.max_queued_per_key:
+                raise QueueFullError(
+                    f"Too many queued jobs for this API key ({self.max_queued_per_key} waiting)",
+                    per_key=True
+                )
+            conn.execute(
+                'INSERT OR REPLACE INTO queue (id, job_id, kind, args, api_key, key_hash, status, enqueued) '
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (f"{kind}:{job_id}", job_id, kind, json.dumps(args), api_key, key_hash, time.time())
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, worker_id):
+        """Atomically claim the next job, serving the least recently served API key first.
+
+        Running entries whose lease has expired (their worker died) are requeued
+        first, or failed once they have been claimed MAX_CLAIMS times.
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            expired = conn.execute(
+                "SELECT id, job_id, kind, claims FROM queue WHERE status = 'running' AND COALESCE(heartbeat, claimed_at) < ?",
+                (now - LEASE_SECONDS,)
+            ).fetchall()
+            failed = []
+            for entry_id, job_id, kind, claims in expired:
+                if claims >= MAX_CLAIMS:
+                    conn.execute("UPDATE queue SET status = 'done', api_key = NULL WHERE id = ?", (entry_id,))
+                    failed.append((job_id, kind))
+                else:
+                    conn.execute("UPDATE queue SET status = 'queued', claimed_by = NULL WHERE id = ?", (entry_id,))
+                logger.warning(f"Lease on {kind} job {job_id} expired after {claims} claim(s), "
+                               + ("failing it" if claims >= MAX_CLAIMS else "requeueing it"))
+
+            # At the running cap only label processing, which is quick, can still be claimed
+            kinds = ''
+            if self.max_running:
+                running = conn.execute(
+                    "SELECT COUNT(*) FROM queue WHERE status = 'running' AND kind = 'transcribe'"
+                ).fetchone()[0]
+                if running >= self.max_running:
+                    kinds = "AND q.kind = 'process' "
+            row = conn.execute(
+                "SELECT q.id, q.job_id, q.kind, q.args, q.api_key FROM queue q WHERE q.status = 'queued' "
+                + kinds + CLAIM_ORDER + " LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                entry_id, job_id, kind, args, api_key = row
+                conn.execute(
+                    "UPDATE queue SET status = 'running', claimed_by = ?, claimed_at = ?, heartbeat = ?, "
+                    "claims = claims + 1 WHERE id = ?",
+                    (worker_id, now, now, entry_id)
+                )
+            conn.execute(
+                "DELETE FROM queue WHERE status = 'done' AND claimed_at < ?",
+                (now - FINISHED_RETENTION,)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        for failed_id, failed_kind in failed:
+            if failed_kind == 'process':
+                self.save_fields(failed_id, {'status': 'Error: worker stopped while applying speaker labels',
+                                             'processing_complete': True})
+            else:
+                self.save_fields(failed_id, {'status': 'Error: worker stopped while transcribing', 'complete': True})
+        if row is None:
+            return None
+        args = [api_key if arg == API_KEY_PLACEHOLDER else arg for arg in json.loads(args)]
+        return job_id, kind, args
+
+    def heartbeat(self, job_id, kind):
+        """Renew the lease on a running job so other workers don't requeue it."""
+        self._connect().execute(
+            "UPDATE queue SET heartbeat = ? WHERE id = ? AND status = 'running'",
+            (time.time(), f"{kind}:{job_id}")
+        )
+
+    def finish(self, job_id, kind):
+        # The API key is kept while the job runs, so a job requeued after a crash can still use it
+        self._connect().execute(
+            "UPDATE queue SET status = 'done', api_key = NULL WHERE id = ?", (f"{kind}:{job_id}",)
+        )
+
+    def position(self, job_id, kind='transcribe'):
+        """Return the 1-based queue position of a job, 0 if running, or None if unknown."""
+        conn = self._connect()
+        entry_id = f"{kind}:{job_id}"
+        row = conn.execute('SELECT status FROM queue WHERE id = ?', (entry_id,)).fetchone()
+        if row is None or row[0] == 'done':
+            return None
+        if row[0] == 'running':
+            return 0
+        ids = [r[0] for r in conn.execute("SELECT q.id FROM queue q WHERE q.status = 'queued' " + CLAIM_ORDER)]
+        return ids.index(entry_id) + 1 if entry_id in ids else None
+
+    def stats(self):
+        counts = dict(self._connect().execute('SELECT status, COUNT(*) FROM queue GROUP BY status').fetchall())
+        return {
+            'backend': 'sqlite',
+            'running': counts.get('running', 0),
+            'queued': counts.get('queued', 0),
+            'max_queued': self.max_queued
+        }
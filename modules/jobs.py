@@ -0,0 +1,280 @@
+"""
+Job tracking and scheduling.
+Jobs are queued per API key and run by a fixed pool of worker threads, taking
+one job from each key in turn so a single client cannot starve the others.
+"""
+import hashlib
+import os
+import logging
+import threading
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted because the queue is full."""
+
+    def __init__(self, message, per_key=False):
+        super().__init__(message)
+        self.per_key = per_key
+
+def hash_api_key(api_key):
+    """Return a short, stable identifier for an API key that is safe to log."""
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+
+def new_job(**fields):
+    """Create a job record with the default progress fields."""
+    job = {
+        'id': str(uuid.uuid4()),
+        'progress': 0,
+        'status': 'Not started',
+        'complete': False,
+        'transcript': [],
+        'processing_progress': 0,
+        'processing_complete': False
+    }
+    job.update(fields)
+    return job
+
+class JobRegistry:
+    """Thread-safe store of job records, keeping the most recent max_jobs."""
+
+    def __init__(self, max_jobs=50):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = job
+            # Evict the oldest finished jobs once over capacity
+            while len(self._jobs) > self.max_jobs:
+                evict = next((job_id for job_id, j in self._jobs.items() if j.get('complete')), None)
+                if evict is None:
+                    break
+                del self._jobs[evict]
+        return job
+
+    def get(self, job_id, fields=None):
+        # In-memory records are shared dicts, so every field is always there
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self, fields=None):
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def active(self):
+        """Return the records of jobs that have not finished transcribing."""
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.get('complete')]
+
+    def search(self, query, limit=50):
+        """Find a phrase in every retained job's transcript index, newest job first."""
+        from modules.transcript_index import find_phrase, word_time
+        with self._lock:
+            jobs = list(reversed(self._jobs.values()))
+        hits = []
+        for job in jobs:
+            index = job.get('transcript_index')
+            if not index:
+                continue
+            for entry, position in find_phrase(index, query, limit - len(hits)):
+                hits.append({
+                    'job_id': job['id'],
+                    'entry': entry,
+                    'position': position,
+                    'time': word_time(index, job['final_transcript'], entry, position)
+                })
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+class JobScheduler:
+    """Bounded job queue served by a fixed pool of worker threads."""
+
+    def __init__(self, name, num_workers=2, max_queued=20, max_queued_per_key=5):
+        self.name = name
+        self.num_workers = num_workers
+        self.max_queued = max_queued
+        self.max_queued_per_key = max_queued_per_key
+        self._queues = OrderedDict()  # key hash -> deque of (job_id, func, args)
+        self._queued = 0
+        self._running = set()
+        self._condition = threading.Condition()
+        self._workers = []
+
+    def _start_workers(self):
+        # Workers are started on first use so importing the app spawns no threads
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f"{self.name}-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job_id, api_key, func, *args):
+        """Queue func(*args) for a job, raising QueueFullError when admission is refused."""
+        key = hash_api_key(api_key)
+        with self._condition:
+            if self._queued >= self.max_queued:
+                raise QueueFullError(f"{self.name} queue is full ({self.max_queued} jobs waiting)")
+            # The key's lane is only created once the job is admitted; workers must never see an empty one
+            if len(self._queues.get(key, ())) >= self.max_queued_per_key:
+                raise QueueFullError(
+                    f"Too many queued jobs for this API key ({self.max_queued_per_key} waiting)",
+                    per_key=True
+                )
+            self._queues.setdefault(key, deque()).append((job_id, func, args))
+            self._queued += 1
+            self._start_workers()
+            self._condition.notify()
+        logger.info(f"Queued job {job_id} on {self.name} (key {key}, {self._queued} waiting)")
+
+    def _next_job(self):
+        # Take the head of the first key's queue, then rotate that key to the back
+        key, queue = next(iter(self._queues.items()))
+        item = queue.popleft()
+        del self._queues[key]
+        if queue:
+            self._queues[key] = queue
+        self._queued -= 1
+        return item
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queued:
+                    self._condition.wait()
+                job_id, func, args = self._next_job()
+                self._running.add(job_id)
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Unhandled error in {self.name} job {job_id}: {str(e)}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+            finally:
+                with self._condition:
+                    self._running.discard(job_id)
+
+    def position(self, job_id):
+        """Return the 1-based queue position of a job, 0 if running, or None if unknown."""
+        with self._condition:
+            if job_id in self._running:
+                return 0
+            # Replay the round-robin order the workers will follow
+            queues = [list(q) for q in self._queues.values()]
+            position = 0
+            depth = 0
+            while any(depth < len(q) for q in queues):
+                for q in queues:
+                    if depth < len(q):
+                        position += 1
+                        if q[depth][0] == job_id:
+                            return position
+                depth += 1
+            return None
+
+    def stats(self):
+        with self._condition:
+            return {
+                'workers': self.num_workers,
+                'running': len(self._running),
+                'queued': self._queued,
+                'max_queued': self.max_queued
+            }
+
+class JobBackend:
+    """Job records plus the queues that run them, as configured by JOB_BACKEND.
+
+    'thread' keeps everything in this process. 'sqlite' keeps jobs in a shared
+    database and runs them on worker threads in every web process, so any
+    process can answer a poll. 'worker' only queues jobs for modules.worker.
+    """
+
+    def __init__(self, mode, jobs, transcription, processing, app_config=None, num_workers=2):
+        self.mode = mode
+        self.jobs = jobs
+        self.transcription = transcription
+        self.processing = processing
+        self.app_config = app_config
+        self.num_workers = num_workers
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+    def ensure_workers(self):
+        """Start embedded database workers once per process (after any fork by the server)."""
+        if self.mode != 'sqlite' or self._worker_pid == os.getpid():
+            return
+        from modules.worker import run_worker
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            for i in range(self.num_workers):
+                threading.Thread(
+                    target=run_worker,
+                    args=(self.jobs, self.app_config),
+                    name=f"sqlite-worker-{i}",
+                    daemon=True
+                ).start()
+
+    def submit(self, kind, job, api_key, *args):
+        """Queue a job of the given kind, raising QueueFullError when admission is refused."""
+        queue = self.processing if kind == 'process' else self.transcription
+        if self.mode == 'thread':
+            from modules.pipeline import run_job
+            queue.submit(job['id'], api_key, run_job, kind, job, args, self.app_config)
+        else:
+            self.ensure_workers()
+            queue.submit(job['id'], api_key, kind, list(args))
+
+    def position(self, job_id):
+        return self.transcription.position(job_id)
+
+    def stats(self):
+        if self.transcription is self.processing:
+            return {'mode': self.mode, 'queue': self.transcription.stats()}
+        return {
+            'mode': self.mode,
+            'transcription': self.transcription.stats(),
+            'processing': self.processing.stats()
+        }
+
+def create_job_backend(app_config):
+    """Build the job backend selected by app_config['JOB_BACKEND']."""
+    mode = app_config.get('JOB_BACKEND', 'thread')
+    max_queued = app_config.get('MAX_QUEUED_JOBS', 20)
+    max_queued_per_key = app_config.get('MAX_QUEUED_JOBS_PER_KEY', 5)
+    num_workers = app_config.get('MAX_CONCURRENT_JOBS', 2)
+
+    if mode in ('sqlite', 'worker'):
+        from modules.job_store import SQLiteJobStore
+        store = SQLiteJobStore(
+            app_config.get('JOB_DB_PATH', os.path.join('data', 'jobs.sqlite3')),
+            max_queued=max_queued,
+            max_queued_per_key=max_queued_per_key,
+            # Every server process runs its own embedded workers, so the cap is kept in the database
+            max_running=num_workers if mode == 'sqlite' else None
+        )
+        return JobBackend(mode, store, store, store, app_config, num_workers)
+
+    if mode != 'thread':
+        raise ValueError(f"Unknown JOB_BACKEND: {mode}")
+
+    transcription = JobScheduler(
+        'transcription',
+        num_workers=num_workers,
+        max_queued=max_queued,
+        max_queued_per_key=max_queued_per_key
+    )
+    processing = JobScheduler(
+        'processing',
+        num_workers=2,
+        max_queued=max_queued,
+        max_queued_per_key=max_queued_per_key
+    )
+    jobs = JobRegistry(max_jobs=app_config.get('MAX_RETAINED_JOBS', 50))
+    return JobBackend(mode, jobs, transcription, processing, app_config, num_workers)
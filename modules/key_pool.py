@@ -0,0 +1,237 @@
+"""
+Server-side pool of ElevenLabs API keys.
+Jobs submitted without a key of their own (and CLI runs with --key-pool) spread
+their segment requests across every pooled key, so one account's concurrency
+and rate limits no longer cap a job. Each key has its own concurrency limit,
+halved when the key is rate limited and raised again as its requests succeed;
+keys answering 401 or 429 are sidelined for a while, and keys with more
+remaining quota are picked more often.
+"""
+import logging
+import random
+import threading
+import time
+
+from config import (API_KEY_POOL, API_KEY_POOL_FILE, API_KEY_POOL_CONCURRENCY, KEY_SIDELINE_SECONDS,
+                    KEY_AUTH_SIDELINE_SECONDS, QUOTA_UNITS_PER_AUDIO_MINUTE)
+from modules.api import capabilities
+from modules.jobs import hash_api_key
+from modules.metrics import metrics
+from modules.transcription import transcribe_segment_with_requests
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the API key of jobs that use the pool
+POOL_API_KEY = '__key_pool__'
+
+# Rejected (401/429) attempts allowed per segment, per pooled key
+RETRIES_PER_KEY = 3
+
+class KeyPoolExhaustedError(Exception):
+    """Raised when no pooled key can take requests (all unauthorized or out of quota)."""
+
+def load_pool_keys(keys=(), path=None):
+    """Return the configured keys followed by those in path (one per line, # comments), without duplicates."""
+    loaded = list(keys)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    loaded.append(line)
+    return list(dict.fromkeys(loaded))
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+class PooledKey:
+    """One key's concurrency limit, sideline state and usage counters."""
+
+    def __init__(self, key, max_limit):
+        self.key = key
+        self.key_hash = hash_api_key(key)
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self.sidelined_until = 0.0
+        self.unauthorized = False
+        self.streak = 0
+        self.last_status = None
+        self.usage = {'requests': 0, 'succeeded': 0, 'rate_limited': 0, 'unauthorized': 0, 'failed': 0, 'audio_seconds': 0.0}
+
+class KeyPool:
+    """Hands out pooled API keys for segment requests, balancing load and quota across them."""
+
+    def __init__(self, keys, concurrency_per_key=3, sideline_seconds=60, auth_sideline_seconds=3600,
+                 units_per_minute=0, capability_cache=capabilities):
+        self.keys = [PooledKey(key, max(1, concurrency_per_key)) for key in keys]
+        self.sideline_seconds = sideline_seconds
+        self.auth_sideline_seconds = auth_sideline_seconds
+        self.units_per_minute = units_per_minute
+        self.capabilities = capability_cache
+        self._changed = threading.Condition()
+
+    @property
+    def capacity(self):
+        """Segment requests the pool can run at once when no key is limited."""
+        return sum(pooled.max_limit for pooled in self.keys)
+
+    def _remaining(self, pooled):
+        entry = self.capabilities.peek(pooled.key)
+        return entry.get('remaining') if entry is not None else None
+
+    def _weights(self, now):
+        # Free slots, scaled by the key's share of the largest known remaining quota
+        remaining = {pooled.key_hash: self._remaining(pooled) for pooled in self.keys}
+        known = [value for value in remaining.values() if value is not None and value > 0]
+        most = max(known) if known else None
+        weights = []
+        for pooled in self.keys:
+            free = pooled.limit - pooled.in_flight
+            left = remaining[pooled.key_hash]
+            if pooled.sidelined_until > now or free <= 0 or (left is not None and left <= 0):
+                weights.append(0)
+            else:
+                weights.append(free * (left / most if left is not None and most else 1.0))
+        return weights, remaining
+
+    def acquire(self):
+        """Block until a key has a free slot and return it, raising KeyPoolExhaustedError if none ever will."""
+        # Quota drives the weighting, so keep every key's capabilities cached (no-op while fresh)
+        for pooled in self.keys:
+            self.capabilities.refresh_in_background(pooled.key)
+
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                weights, remaining = self._weights(now)
+                if any(weights):
+                    pooled = random.choices(self.keys, weights=weights)[0]
+                    pooled.in_flight += 1
+                    return pooled
+
+                # Rate-limited and busy keys come back by themselves; unauthorized or spent ones don't soon
+                def recovers(pooled):
+                    left = remaining[pooled.key_hash]
+                    return not (pooled.unauthorized and pooled.sidelined_until > now) and not (left is not None and left <= 0)
+                if not any(recovers(pooled) for pooled in self.keys):
+                    raise KeyPoolExhaustedError('Every pooled API key is unauthorized or out of quota')
+                wake = min((pooled.sidelined_until for pooled in self.keys if pooled.sidelined_until > now), default=None)
+                self._changed.wait(None if wake is None else wake - now)
+
+    def release(self, pooled, response=None, audio_ms=0):
+        """Return a key's slot, adapting its limit and sideline state to the response it got."""
+        status = response.status_code if response is not None else None
+        with self._changed:
+            pooled.in_flight -= 1
+            pooled.last_status = status
+            pooled.usage['requests'] += 1
+            if status == 200:
+                pooled.usage['succeeded'] += 1
+                pooled.usage['audio_seconds'] += audio_ms / 1000
+                pooled.unauthorized = False
+                # Additive increase: one more slot after a full limit's worth of successes
+                pooled.streak += 1
+                if pooled.streak >= pooled.limit and pooled.limit < pooled.max_limit:
+                    pooled.limit += 1
+                    pooled.streak = 0
+            elif status == 429:
+                pooled.usage['rate_limited'] += 1
+                pooled.limit = max(1, pooled.limit // 2)
+                pooled.streak = 0
+                wait = _retry_after(response)
+                pooled.sidelined_until = time.monotonic() + (self.sideline_seconds if wait is None else wait)
+                logger.warning(f"Pooled key {pooled.key_hash} rate limited, limit now {pooled.limit}")
+            elif status == 401:
+                pooled.usage['unauthorized'] += 1
+                pooled.unauthorized = True
+                pooled.sidelined_until = time.monotonic() + self.auth_sideline_seconds
+                logger.warning(f"Pooled key {pooled.key_hash} unauthorized, sidelined for {self.auth_sideline_seconds}s")
+            else:
+                pooled.usage['failed'] += 1
+            self._changed.notify_all()
+
+        metrics.inc(
+            'scribe_key_pool_requests_total', 1,
+            help='Segment requests sent through the API key pool by key and status',
+            key=pooled.key_hash, status=str(status) if status is not None else 'error'
+        )
+        if status == 200:
+            self.capabilities.record_usage(pooled.key, (audio_ms / 60000) * self.units_per_minute)
+
+    def transcribe(self, segment_path, enable_diarization=True, num_speakers='', model_id='scribe_v1', audio_ms=0):
+        """Transcribe a segment on a pooled key, retrying (on another key when possible) after a 401 or 429."""
+        for attempt in range(RETRIES_PER_KEY * len(self.keys) + 1):
+            try:
+                pooled = self.acquire()
+            except KeyPoolExhaustedError as e:
+                logger.error(f"Cannot transcribe {segment_path}: {str(e)}")
+                return []
+            responses = []
+            try:
+                transcript = transcribe_segment_with_requests(
+                    segment_path, pooled.key, enable_diarization, num_speakers, model_id,
+                    on_response=responses.append
+                )
+            finally:
+                self.release(pooled, responses[-1] if responses else None, audio_ms)
+            if not responses or responses[-1].status_code not in (401, 429):
+                return transcript
+            logger.info(f"Retrying {segment_path} on another pooled key (attempt {attempt + 2})")
+        return []
+
+    def report(self):
+        """Per-key limits, state and usage, identifying keys only by their hash."""
+        now = time.monotonic()
+        with self._changed:
+            keys = [
+                {
+                    'key': pooled.key_hash,
+                    'limit': pooled.limit,
+                    'max_limit': pooled.max_limit,
+                    'in_flight': pooled.in_flight,
+                    'sidelined_for': round(max(0.0, pooled.sidelined_until - now), 1),
+                    'unauthorized': pooled.unauthorized,
+                    'last_status': pooled.last_status,
+                    'remaining': self._remaining(pooled),
+                    'usage': dict(pooled.usage, audio_seconds=round(pooled.usage['audio_seconds'], 1))
+                }
+                for pooled in self.keys
+            ]
+        return {'capacity': self.capacity, 'keys': keys}
+
+# One pool per process, shared by every job and worker thread; limits and usage are not shared
+# between processes, which is why the web server only offers the pool with the thread backend
+_pool = None
+_pool_loaded = False
+_pool_lock = threading.Lock()
+
+def get_key_pool(app_config=None):
+    """Return the process's key pool built from API_KEY_POOL and API_KEY_POOL_FILE, or None if no keys are configured.
+
+    Keys are loaded once; an unreadable key file is logged and leaves the pool disabled.
+    """
+    global _pool, _pool_loaded
+    app_config = app_config or {}
+    with _pool_lock:
+        if not _pool_loaded:
+            _pool_loaded = True
+            path = app_config.get('API_KEY_POOL_FILE', API_KEY_POOL_FILE)
+            try:
+                keys = load_pool_keys(app_config.get('API_KEY_POOL', API_KEY_POOL), path)
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Cannot read API_KEY_POOL_FILE {path}: {str(e)}; the API key pool is disabled")
+                keys = []
+            if keys:
+                _pool = KeyPool(
+                    keys,
+                    concurrency_per_key=app_config.get('API_KEY_POOL_CONCURRENCY', API_KEY_POOL_CONCURRENCY),
+                    sideline_seconds=app_config.get('KEY_SIDELINE_SECONDS', KEY_SIDELINE_SECONDS),
+                    auth_sideline_seconds=app_config.get('KEY_AUTH_SIDELINE_SECONDS', KEY_AUTH_SIDELINE_SECONDS),
+                    units_per_minute=app_config.get('QUOTA_UNITS_PER_AUDIO_MINUTE', QUOTA_UNITS_PER_AUDIO_MINUTE)
+                )
+                logger.info(f"API key pool enabled with {len(keys)} key(s), capacity {_pool.capacity}")
+        return _pool
@@ -0,0 +1,163 @@
+"""
+Stage timing instrumentation.
+Spans record how long each pipeline stage takes into Prometheus-style counters and
+histograms (served on /metrics) and into a per-job breakdown on the job record.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from ffprobe calls up to multi-minute API requests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+def _label_key(name, labels):
+    # Label values are kept as strings, so series with differently typed values still sort together
+    return (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = _label_key(name, labels)
+        with self._lock:
+            if help:
+                self._help.setdefault(name, ('counter', help))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, help=None, **labels):
+        key = _label_key(name, labels)
+        with self._lock:
+            if help:
+                self._help.setdefault(name, ('gauge', help))
+            self._gauges[key] = value
+
+    def observe(self, name, value, help=None, **labels):
+        key = _label_key(name, labels)
+        with self._lock:
+            if help:
+                self._help.setdefault(name, ('histogram', help))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            described = set()
+
+            def describe(name, kind):
+                if name in described:
+                    return
+                described.add(name)
+                help_kind, help_text = self._help.get(name, (kind, name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            for (name, labels), value in sorted(self._counters.items()):
+                describe(name, 'counter')
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for (name, labels), value in sorted(self._gauges.items()):
+                describe(name, 'gauge')
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                describe(name, 'histogram')
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+# Shared registry for this process
+metrics = Metrics()
+
+# Job whose breakdown spans on this thread are recorded into
+_bound = threading.local()
+
+# Serialises breakdown updates when several threads are bound to the same job
+_job_lock = threading.Lock()
+
+@contextmanager
+def bind_job(job):
+    """Attach spans opened on this thread to a job record's 'timings' breakdown."""
+    previous = getattr(_bound, 'job', None)
+    _bound.job = job
+    try:
+        yield job
+    finally:
+        _bound.job = previous
+
+def current_job():
+    """Return the job record bound to this thread, if any."""
+    return getattr(_bound, 'job', None)
+
+def record_job_timing(job, stage, elapsed):
+    """Add one span of a stage to a job's timing breakdown."""
+    with _job_lock:
+        timings = dict(job.get('timings') or {})
+        stage_timing = dict(timings.get(stage) or {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+        stage_timing['count'] += 1
+        stage_timing['total_s'] = round(stage_timing['total_s'] + elapsed, 6)
+        stage_timing['max_s'] = round(max(stage_timing['max_s'], elapsed), 6)
+        timings[stage] = stage_timing
+        # Assign a new dict so job stores that persist on assignment see the change
+        job['timings'] = timings
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage, recording it globally and on the bound job."""
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe(
+            'scribe_stage_duration_seconds', elapsed,
+            help='Time spent in each pipeline stage', stage=stage
+        )
+        metrics.inc(
+            'scribe_stage_total', 1,
+            help='Pipeline stage executions by outcome', stage=stage, status=status
+        )
+        job = current_job()
+        if job is not None:
+            record_job_timing(job, stage, elapsed)
+
+def record_api_call(status_code, bytes_sent, bytes_received):
+    """Count an ElevenLabs API call and the bytes it moved."""
+    metrics.inc('scribe_api_requests_total', 1, help='ElevenLabs API requests by status', status=status_code)
+    metrics.inc('scribe_api_bytes_sent_total', bytes_sent, help='Bytes uploaded to the ElevenLabs API')
+    metrics.inc('scribe_api_bytes_received_total', bytes_received, help='Bytes received from the ElevenLabs API')
+    job = current_job()
+    if job is not None:
+        with _job_lock:
+            job['api_bytes'] = {
+                'sent': (job.get('api_bytes') or {}).get('sent', 0) + bytes_sent,
+                'received': (job.get('api_bytes') or {}).get('received', 0) + bytes_received
+            }
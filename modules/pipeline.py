@@ -0,0 +1,239 @@
+"""
+Job pipeline shared by the web server's worker threads and standalone workers.
+"""
+import os
+import logging
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from config import SEGMENT_DURATION, OVERLAP_DURATION, SEGMENT_CONCURRENCY
+from modules.utils import clean_up_file
+from modules.workspace import JobWorkspace
+from modules.audio import split_audio, get_audio_info
+from modules.transcription import IncrementalMerger, transcribe_segment_with_requests, process_transcript_with_labels
+from modules.api import QuotaExceededError, capabilities, check_quota
+from modules.fingerprint import compute_fingerprint, find_reusable_segments, get_fingerprint_store, source_utterances
+from modules.jobs import hash_api_key
+from modules.key_pool import POOL_API_KEY, get_key_pool
+from modules.metrics import bind_job, metrics, span
+
+logger = logging.getLogger(__name__)
+
+def process_audio(current_job, file_path, api_key, enable_diarization=True, num_speakers='', model_id='scribe_v1', app_config=None):
+    """Process audio file: split into segments and transcribe."""
+    background = None
+    cancel_fingerprint = threading.Event()
+    try:
+        current_job['status'] = 'Processing audio file'
+        
+        logger.info(f"Starting audio processing for file: {file_path}")
+        logger.info(f"Settings: diarization={enable_diarization}, speakers={num_speakers}, model={model_id}")
+        
+        # Jobs without a key of their own spread their segments over the server's key pool
+        key_pool = None
+        if api_key == POOL_API_KEY:
+            key_pool = get_key_pool(app_config)
+            if key_pool is None:
+                raise RuntimeError('This job uses the API key pool, but no pooled keys are configured')
+        
+        # Optionally refresh this key's models and quota in the background, off the job path
+        if app_config and app_config.get('PROBE_API_ON_JOB') and key_pool is None:
+            capabilities.refresh_in_background(api_key)
+        
+        # Refuse jobs the key cannot afford before any audio is uploaded (cached data only)
+        units_per_minute = app_config.get('QUOTA_UNITS_PER_AUDIO_MINUTE', 0) if app_config else 0
+        if key_pool is None and capabilities.peek(api_key) is not None:
+            check_quota(api_key, get_audio_info(file_path)['duration'], units_per_minute)
+        
+        # Fingerprint the recording alongside splitting, to find audio this key already had transcribed
+        # (for pool jobs, which share one credential, audio the same submitter had transcribed)
+        dedup_scope = hash_api_key(api_key) if key_pool is None else current_job.get('submitter')
+        dedup = bool(app_config and app_config.get('AUDIO_DEDUP')) and dedup_scope is not None
+        background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fingerprint') if dedup else None
+        fingerprint = background.submit(fingerprint_audio, current_job, file_path, cancel_fingerprint) if dedup else None
+        
+        # Stage segments in a per-job scratch workspace that is removed on every exit path
+        with JobWorkspace(current_job['id'], app_config, required_bytes=os.path.getsize(file_path)) as workspace:
+            # Split audio into segments with overlap
+            current_job['status'] = 'Splitting audio into segments'
+            logger.info("Splitting audio file into segments with overlap")
+        
+            try:
+                # Pass app_config to avoid application context issues
+                segments = split_audio(
+                    file_path, 
+                    SEGMENT_DURATION, 
+                    OVERLAP_DURATION, 
+                    app_config=app_config,
+                    output_folder=workspace.path
+                )
+                logger.info(f"Successfully split audio into {len(segments)} segments")
+                current_job['raw_segments'] = segments  # Store raw segment information
+            except Exception as e:
+                error_details = traceback.format_exc()
+                logger.error(f"Error splitting audio: {str(e)}")
+                logger.error(f"Traceback: {error_details}")
+                current_job['status'] = f'Error splitting audio: {str(e)}'
+                current_job['complete'] = True
+                return
+        
+            # Segments fully covered by audio transcribed before are taken from the earlier transcript
+            reused = {}
+            if fingerprint is not None:
+                try:
+                    hashes = fingerprint.result()
+                    with span('dedup_lookup'):
+                        reused = find_reusable_segments(get_fingerprint_store(app_config), dedup_scope, hashes, segments)
+                except Exception as e:
+                    logger.warning(f"Audio fingerprinting failed, transcribing every segment: {str(e)}")
+                    hashes = None
+                current_job['reused_segments'] = sorted(reused)
+                if reused:
+                    metrics.inc('scribe_segments_reused_total', len(reused), help='Segments served from earlier transcripts instead of the API')
+            
+            # Transcribe segments concurrently, publishing the merged transcript as its prefix grows
+            concurrency = app_config.get('SEGMENT_CONCURRENCY', SEGMENT_CONCURRENCY) if app_config else SEGMENT_CONCURRENCY
+            if key_pool is not None:
+                # The pool limits each key itself, so let the job use all of its slots
+                concurrency = key_pool.capacity
+            merger = IncrementalMerger(segments)
+            segment_transcriptions = [None] * len(segments)
+            current_job['status'] = f'Transcribing {len(segments)} segment(s)'
+            
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='segment') as pool:
+                # The pool starts work in submission order, so segment 0 (which decides the speakers) goes first
+                futures = []
+                for segment in segments:
+                    if segment['index'] in reused:
+                        clean_up_file(segment['path'])
+                        done_future = Future()
+                        done_future.set_result((segment['index'], add_segment_metadata(segment, reused[segment['index']])))
+                        futures.append(done_future)
+                    else:
+                        futures.append(pool.submit(
+                            transcribe_segment, current_job, segment, api_key, enable_diarization, num_speakers, model_id, key_pool
+                        ))
+                for done, future in enumerate(as_completed(futures), start=1):
+                    segment_index, segment_transcript = future.result()
+                    segment_transcriptions[segment_index] = segment_transcript
+                    logger.info(f"Segment {segment_index+1}/{len(segments)} transcription result has {len(segment_transcript)} items")
+                    
+                    # Speakers come from the first segment alone, so labeling can start right away
+                    if segment_index == 0:
+                        current_job['first_segment'] = segment_transcript
+                        current_job['speakers'] = list(set(item.get('speaker', 'Unknown') for item in segment_transcript))
+                        logger.info(f"Found {len(current_job['speakers'])} unique speakers in the first segment")
+                    
+                    # Results are merged in segment order; later ones wait for the gap to fill
+                    if merger.add(segment_index, segment_transcript):
+                        with span('merge_incremental'):
+                            current_job['transcript'] = merger.snapshot()
+                        # Store the contiguous run of finished segments for later processing
+                        current_job['all_segments'] = segment_transcriptions[:merger.next_index]
+                    
+                    current_job['status'] = f'Transcribed {done} of {len(segments)} segments'
+                    current_job['progress'] = int((done / len(segments)) * 100)
+        
+            # Remember this recording so later uploads of the same audio can reuse its transcript
+            if fingerprint is not None and hashes is not None:
+                try:
+                    with span('fingerprint_store'):
+                        utterances, trusted = source_utterances(segments, segment_transcriptions)
+                        get_fingerprint_store(app_config).add_source(
+                            current_job['id'], dedup_scope, hashes, utterances, trusted
+                        )
+                except Exception as e:
+                    logger.warning(f"Could not store audio fingerprint: {str(e)}")
+            
+            # Keep the cached quota roughly current until the next refresh (reused segments cost nothing;
+            # the key pool records usage per pooled key as requests succeed)
+            if key_pool is None:
+                transcribed_ms = sum(segment['end_time'] - segment['start_time'] for segment in segments if segment['index'] not in reused)
+                capabilities.record_usage(api_key, (transcribed_ms / 60000) * units_per_minute)
+            
+            # Mark as ready for post-processing; 'complete' goes last, as label requests check it
+            current_job['status'] = 'Ready for speaker labeling'
+            current_job['progress'] = 100
+            current_job['stage'] = 'speaker_labeling'  # Indicate we're in the labeling stage
+            current_job['complete'] = True
+        
+    except QuotaExceededError as e:
+        logger.warning(f"Rejected job {current_job['id']}: {str(e)}")
+        current_job['status'] = f'Rejected: {str(e)}'
+        current_job['complete'] = True
+    except Exception as e:
+        error_details = traceback.format_exc()
+        logger.error(f"Error in process_audio: {str(e)}")
+        logger.error(f"Traceback: {error_details}")
+        current_job['status'] = f'Error: {str(e)}'
+        current_job['complete'] = True
+    finally:
+        if background is not None:
+            # Stop the decoder if the job ended before its fingerprint was needed (e.g. splitting failed)
+            cancel_fingerprint.set()
+            background.shutdown(wait=False)
+        # The uploaded original is removed whether or not the job succeeded
+        clean_up_file(file_path)
+
+def fingerprint_audio(current_job, file_path, cancel=None):
+    """Compute a recording's fingerprint on a background thread, timed into the job's breakdown."""
+    with bind_job(current_job), span('fingerprint'):
+        return compute_fingerprint(file_path, cancel)
+
+def add_segment_metadata(segment, segment_transcript):
+    """Tag a segment's transcript items with the segment and their absolute times (ms)."""
+    for item in segment_transcript:
+        item['segment_index'] = segment['index']
+        item['segment_start_time'] = segment['start_time']
+        item['absolute_start'] = segment['start_time'] + item.get('start', 0) * 1000
+        item['absolute_end'] = segment['start_time'] + item.get('end', 0) * 1000
+    return segment_transcript
+
+def transcribe_segment(current_job, segment, api_key, enable_diarization=True, num_speakers='', model_id='scribe_v1', key_pool=None):
+    """Transcribe one segment on a pool thread, returning (segment index, transcript items)."""
+    # Spans on pool threads count towards the job's timing breakdown too
+    with bind_job(current_job):
+        logger.info(f"Starting transcription of segment {segment['index']+1}: {segment['path']}")
+        try:
+            if key_pool is not None:
+                segment_transcript = key_pool.transcribe(
+                    segment['path'],
+                    enable_diarization,
+                    num_speakers,
+                    model_id,
+                    audio_ms=segment['end_time'] - segment['start_time']
+                )
+            else:
+                segment_transcript = transcribe_segment_with_requests(
+                    segment['path'], 
+                    api_key, 
+                    enable_diarization, 
+                    num_speakers, 
+                    model_id
+                )
+        finally:
+            # Clean up segment file
+            clean_up_file(segment['path'])
+    
+    return segment['index'], add_segment_metadata(segment, segment_transcript)
+
+def run_job(kind, current_job, args, app_config=None):
+    """Run a queued job of the given kind ('transcribe' or 'process') against its job record."""
+    # Spans opened while the job runs are recorded in its timing breakdown
+    with bind_job(current_job):
+        if kind == 'transcribe':
+            with span('transcribe_job'):
+                process_audio(current_job, *args, app_config=app_config)
+            # Labels given while the tail was transcribing are applied here; pop() is atomic (also for
+            # stored jobs), so either this worker or the request that saved them queues them, never both
+            speaker_labels = current_job.pop('pending_speaker_labels', None)
+            if speaker_labels:
+                logger.info(f"Applying speaker labels given during transcription of job {current_job['id']}")
+                with span('relabel'):
+                    process_transcript_with_labels(current_job, speaker_labels)
+        elif kind == 'process':
+            with span('relabel'):
+                process_transcript_with_labels(current_job, *args)
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
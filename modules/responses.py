@@ -0,0 +1,165 @@
+"""
+Cached, compressed JSON responses for the transcript polling endpoints.
+A multi-hour transcript is re-sent on every poll although it only changes when
+a segment finishes, so each job's transcript is read once per job version and
+the slices clients ask for are encoded and compressed once, then served from
+memory until the job changes again.
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+from modules.metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; compressing them saves nothing
+COMPRESS_MIN_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def dumps(payload):
+    """Encode payload as compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def to_columns(entries):
+    """Convert transcript entries to one list per field, with speaker names stored once.
+
+    `speaker` holds indexes into `speakers`; fields missing from an entry are null.
+    """
+    fields = []
+    for entry in entries:
+        for field in entry:
+            if field not in fields:
+                fields.append(field)
+    speakers = []
+    speaker_ids = {}
+    columns = {field: [] for field in fields}
+    for entry in entries:
+        for field in fields:
+            value = entry.get(field)
+            if field == 'speaker' and value is not None:
+                if value not in speaker_ids:
+                    speaker_ids[value] = len(speakers)
+                    speakers.append(value)
+                value = speaker_ids[value]
+            columns[field].append(value)
+    return {'count': len(entries), 'speakers': speakers, 'columns': columns}
+
+def shape_transcript(entries, shape):
+    """Return entries in the requested shape ('rows', the default, or 'columns')."""
+    return to_columns(entries) if shape == 'columns' else entries
+
+def choose_encoding(accept_encodings):
+    """Pick the best content encoding the client accepts (a werkzeug Accept), or None."""
+    best, best_quality = None, 0
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+def field_version(job, field):
+    """Return a token that changes whenever job[field] is replaced.
+
+    Stored jobs carry the time their record was last written; in-memory jobs
+    replace transcript lists wholesale, so the list's identity is enough.
+    """
+    version = getattr(job, 'version', None)
+    return version if version is not None else id(job.get(field))
+
+# Encoded slices (pages, or poll tails) kept per cached document
+MAX_BODIES_PER_ENTRY = 32
+
+class ResponseCache:
+    """Transcript documents and their encoded, compressed slices, kept per (endpoint, job, shape)
+    for the latest version only."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                entry = {'version': version, 'document': None, 'bodies': OrderedDict()}
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            return entry
+
+    def body(self, key, version, build, encoding, shape='rows', offset=0, limit=None):
+        """Return (body, applied encoding, cache hit) for a slice of the document at version.
+
+        build() returns (meta, entries) and runs at most once per version, so the
+        job's transcript is only read and decoded when it has changed. The body is
+        meta plus entries[offset:offset + limit] as 'transcript', with the offset
+        and the transcript's total length.
+        """
+        entry = self._entry(key, version)
+        slice_key = (offset, limit, encoding)
+        with self._lock:
+            cached = entry['bodies'].get(slice_key)
+        if cached is not None:
+            return cached + (True,)
+
+        # Built outside the lock; two racing polls at worst both build the same document
+        document = entry['document']
+        if document is None:
+            document = entry['document'] = build()
+        meta, entries = document
+        start = min(max(0, offset), len(entries))
+        end = len(entries) if limit is None else start + max(0, limit)
+        raw = dumps(dict(meta, offset=start, total=len(entries), transcript=shape_transcript(entries[start:end], shape)))
+        if encoding is not None and len(raw) >= COMPRESS_MIN_BYTES:
+            cached = (compress(raw, encoding), encoding)
+        else:
+            cached = (raw, None)
+        with self._lock:
+            entry['bodies'][slice_key] = cached
+            while len(entry['bodies']) > MAX_BODIES_PER_ENTRY:
+                entry['bodies'].popitem(last=False)
+        return cached + (False,)
+
+    def respond(self, request, key, version, build, shape='rows', offset=0, limit=None):
+        """Return a JSON Response for the request, compressed as its Accept-Encoding allows."""
+        body, encoding, hit = self.body(
+            key, version, build, choose_encoding(request.accept_encodings), shape, offset, limit
+        )
+        metrics.inc(
+            'scribe_response_cache_total', 1,
+            help='Transcript responses served from the encoded response cache or rebuilt',
+            result='hit' if hit else 'miss'
+        )
+        response = Response(body, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,110 @@
+"""
+Search and seek index over a finished transcript.
+Built once when speaker labels are applied and stored on the job record, so
+finding a phrase or jumping to a time never scans the whole transcript.
+"""
+import re
+from bisect import bisect_right
+
+INDEX_VERSION = 1
+
+_TOKEN = re.compile(r"\w+(?:'\w+)*")
+
+def tokenize(text):
+    """Split text into lower-case search terms."""
+    return _TOKEN.findall((text or '').lower())
+
+def build_index(entries):
+    """Index transcript entries (sorted by `start`, in ms) for phrase search and time seek.
+
+    The index is plain lists and dicts so it can be stored with the job record:
+    `starts` holds each entry's start time for binary search, `word_counts` the
+    number of terms per entry, and `postings` maps each term to a flat
+    [entry, position, entry, position, ...] list.
+    """
+    starts = []
+    word_counts = []
+    postings = {}
+    for entry_index, entry in enumerate(entries):
+        starts.append(entry.get('start', 0))
+        terms = tokenize(entry.get('text', ''))
+        word_counts.append(len(terms))
+        for position, term in enumerate(terms):
+            postings.setdefault(term, []).extend((entry_index, position))
+    return {
+        'version': INDEX_VERSION,
+        'starts': starts,
+        'word_counts': word_counts,
+        'postings': postings
+    }
+
+def _occurrences(index, term):
+    flat = index['postings'].get(term, [])
+    return zip(flat[0::2], flat[1::2])
+
+def _occurs(flat, entry, position):
+    """Binary search a flat, sorted [entry, position, ...] postings list for one occurrence."""
+    lo, hi = 0, len(flat) // 2
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (flat[2 * mid], flat[2 * mid + 1]) < (entry, position):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo < len(flat) // 2 and flat[2 * lo] == entry and flat[2 * lo + 1] == position
+
+def find_phrase(index, query, limit=None):
+    """Return sorted (entry, position) pairs where the query's terms occur consecutively (the first `limit`)."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    # Walk the rarest term's postings and binary search the others' for each candidate,
+    # so a query costs O(rarest occurrences * log(common occurrences))
+    postings = [index['postings'].get(term, []) for term in terms]
+    rarest = min(range(len(terms)), key=lambda i: len(postings[i]))
+    others = [(offset, flat) for offset, flat in enumerate(postings) if offset != rarest]
+    hits = []
+    for entry, position in _occurrences(index, terms[rarest]):
+        start = position - rarest
+        if start >= 0 and all(_occurs(flat, entry, start + offset) for offset, flat in others):
+            hits.append((entry, start))
+            if limit is not None and len(hits) >= limit:
+                break
+    return hits
+
+def word_time(index, entries, entry, position):
+    """Estimate when a word is spoken by interpolating across its entry."""
+    start = index['starts'][entry]
+    end = entries[entry].get('end', start)
+    count = index['word_counts'][entry] or 1
+    return round(start + (end - start) * position / count)
+
+def search_index(index, entries, query, limit=50):
+    """Find a phrase in one transcript, returning hits with timestamps and their entry."""
+    hits = []
+    for entry, position in find_phrase(index, query, limit):
+        item = entries[entry]
+        hits.append({
+            'entry': entry,
+            'position': position,
+            'time': word_time(index, entries, entry, position),
+            'start': item.get('start', 0),
+            'end': item.get('end', 0),
+            'speaker': item.get('speaker'),
+            'text': item.get('text', '')
+        })
+    return hits
+
+def seek(index, entries, at, context=2):
+    """Return the entry playing at `at` ms (or the last one before it) and `context` entries each side."""
+    if not index['starts']:
+        return None, []
+    current = max(0, bisect_right(index['starts'], at) - 1)
+    first = max(0, current - context)
+    return current, [dict(entries[i], entry=i) for i in range(first, min(len(entries), current + context + 1))]
+
+def iter_terms(index, entries):
+    """Yield (term, entry, position, time) rows for every indexed word, for cross-job term tables."""
+    for term, flat in index['postings'].items():
+        for entry, position in zip(flat[0::2], flat[1::2]):
+            yield term, entry, position, word_time(index, entries, entry, position)
@@ -1,13 +1,33 @@
+import os
 import logging
 import traceback
-import requests
 import time
+import random
+from config import ELEVENLABS_API_BASE, LOG_API_PAYLOADS, PAYLOAD_LOG_SAMPLE_RATE
 from modules.utils import clean_up_file
+from modules.metrics import span, record_api_call
+from modules.transcript_index import build_index
 
 logger = logging.getLogger(__name__)
 
-def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=True, num_speakers='', model_id='scribe_v1'):
-    """Transcribe a single audio segment using ElevenLabs API."""
+# MIME types for the segment containers produced by split_audio
+SEGMENT_MIME_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.m4a': 'audio/mp4',
+    '.ogg': 'audio/ogg',
+}
+
+def should_log_payload():
+    """Decide whether to log a full API/transcript payload (opt-in and sampled)."""
+    return LOG_API_PAYLOADS and random.random() < PAYLOAD_LOG_SAMPLE_RATE
+
+def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=True, num_speakers='', model_id='scribe_v1', on_response=None):
+    """Transcribe a single audio segment using ElevenLabs API.
+
+    on_response, if given, is called with the raw API response (used by the key pool).
+    """
+    import requests  # Imported lazily to keep app startup fast
+    
     try:
         logger.info(f"Starting transcription for segment: {segment_path}")
         logger.info(f"Settings: diarization={enable_diarization}, speakers={num_speakers}, model={model_id}")
@@ -21,7 +41,7 @@ def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=T
             logger.info(f"Audio file size: {file_size} bytes")
             
             # The correct endpoint according to documentation
-            url = 'https://api.elevenlabs.io/v1/speech-to-text'
+            url = f'{ELEVENLABS_API_BASE}/v1/speech-to-text'
             
             logger.info(f"Making request to ElevenLabs API: {url}")
             
@@ -30,9 +50,12 @@ def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=T
                 'Accept': 'application/json'
             }
             
-            # Create the multipart form data
+            # Create the multipart form data, keeping the container of stream-copied segments
+            extension = os.path.splitext(segment_path)[1].lower()
+            if extension not in SEGMENT_MIME_TYPES:
+                extension = '.mp3'
             files = {
-                'file': ('audio.mp3', audio_data, 'audio/mpeg')
+                'file': (f"audio{extension}", audio_data, SEGMENT_MIME_TYPES[extension])
             }
             
             # Parameters according to documentation
@@ -50,19 +73,24 @@ def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=T
             logger.info("Request setup complete, sending API request...")
             
             # Make the request with the correct parameters
-            response = requests.post(
-                url,
-                headers=headers,
-                files=files,
-                data=data
-            )
+            with span('api_call'):
+                response = requests.post(
+                    url,
+                    headers=headers,
+                    files=files,
+                    data=data
+                )
+            record_api_call(response.status_code, file_size, len(response.content))
+            if on_response is not None:
+                on_response(response)
             
-            # Log response status and headers for debugging
+            # Log response status for debugging
             logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response headers: {response.headers}")
             
-            # Add complete response logging for debugging
-            logger.info(f"Response content: {response.text}")
+            # Full headers and content are only logged when payload logging is enabled
+            if should_log_payload():
+                logger.debug(f"Response headers: {response.headers}")
+                logger.debug(f"Response content: {response.text}")
             
             # Check if response is successful
             if response.status_code != 200:
@@ -147,6 +175,93 @@ def transcribe_segment_with_requests(segment_path, api_key, enable_diarization=T
         logger.error(f"Traceback: {error_details}")
         return []
 
+def map_segment_speakers(segment_speakers, first_segment_speakers):
+    """Map a later segment's sorted speaker ids onto the first segment's by position."""
+    if not first_segment_speakers:
+        # Nothing to map onto; keep the segment's own ids
+        return {}
+    mapping = {}
+    for idx, speaker in enumerate(segment_speakers):
+        # With more speakers than the first segment, wrap around (modulo mapping)
+        mapping[speaker] = first_segment_speakers[idx % len(first_segment_speakers)]
+    return mapping
+
+# Utterances of the same speaker closer than this (ms) are joined into one entry
+MERGE_GAP = 2000
+
+class IncrementalMerger:
+    """Builds the merged transcript a segment at a time, as results arrive.
+
+    Produces the same entries as merge_transcriptions, but publishes a stable
+    prefix early: results are applied in segment order (later segments are
+    buffered until the gap is filled), and utterances are only released once
+    no later segment can start before them. Only the last entry may still grow.
+    """
+
+    def __init__(self, raw_segments, speaker_labels=None):
+        self.raw_segments = raw_segments
+        self.speaker_labels = speaker_labels or {}
+        self.first_segment_speakers = []
+        self.next_index = 0
+        self.entries = []
+        self._waiting = {}  # segment index -> transcript that arrived out of order
+        self._buffer = []  # utterances that a later segment may still precede
+
+    @property
+    def complete(self):
+        return self.next_index >= len(self.raw_segments)
+
+    def add(self, segment_index, segment_transcript):
+        """Add one segment's transcript, returning True if the published prefix changed."""
+        self._waiting[segment_index] = segment_transcript
+        applied = False
+        while self.next_index in self._waiting:
+            self._apply(self.next_index, self._waiting.pop(self.next_index))
+            self.next_index += 1
+            applied = True
+        return applied
+
+    def _apply(self, segment_idx, segment_transcript):
+        segment_start_time = self.raw_segments[segment_idx].get('start_time', 0)
+        speakers = sorted(set(item.get('speaker', 'Unknown') for item in segment_transcript))
+        if segment_idx == 0:
+            self.first_segment_speakers = speakers
+            speaker_mapping = {}
+        else:
+            speaker_mapping = map_segment_speakers(speakers, self.first_segment_speakers)
+        
+        for item in segment_transcript:
+            speaker = item.get('speaker', 'Unknown')
+            mapped_speaker = speaker_mapping.get(speaker, speaker)
+            self._buffer.append({
+                'text': item.get('text', ''),
+                'speaker': self.speaker_labels.get(mapped_speaker, f"Speaker {mapped_speaker}"),
+                'start': segment_start_time + item.get('start', 0) * 1000,
+                'end': segment_start_time + item.get('end', 0) * 1000,
+                'segment_index': segment_idx
+            })
+        
+        # Anything starting before the next segment can no longer be preceded by a later utterance
+        self._buffer.sort(key=lambda x: x['start'])
+        if segment_idx + 1 < len(self.raw_segments):
+            horizon = self.raw_segments[segment_idx + 1].get('start_time', 0)
+        else:
+            horizon = float('inf')
+        released = [u for u in self._buffer if u['start'] < horizon]
+        self._buffer = [u for u in self._buffer if u['start'] >= horizon]
+        
+        for entry in released:
+            last = self.entries[-1] if self.entries else None
+            if last and entry['speaker'] == last['speaker'] and entry['start'] - last['end'] < MERGE_GAP:
+                last['text'] += " " + entry['text']
+                last['end'] = entry['end']
+            else:
+                self.entries.append(entry)
+
+    def snapshot(self):
+        """Return a copy of the entries published so far."""
+        return [dict(entry) for entry in self.entries]
+
 def merge_transcriptions(segments, speaker_labels, raw_segments=None):
     """Merge transcriptions and apply speaker labels with improved speaker matching."""
     try:
@@ -168,9 +283,9 @@ def merge_transcriptions(segments, speaker_labels, raw_segments=None):
                 segment_start_time = segment_info.get('start_time', 0)
             
             for item in segment_transcript:
-                # Calculate absolute timestamps
-                start_time = segment_start_time + item.get('start', 0)
-                end_time = segment_start_time + item.get('end', 0)
+                # Calculate absolute timestamps (segment offsets are ms, API times are seconds)
+                start_time = segment_start_time + item.get('start', 0) * 1000
+                end_time = segment_start_time + item.get('end', 0) * 1000
                 
                 all_utterances.append({
                     'text': item.get('text', ''),
@@ -201,27 +316,8 @@ def merge_transcriptions(segments, speaker_labels, raw_segments=None):
             segment_speakers = sorted(set(u['speaker'] for u in all_utterances if u['segment_index'] == segment_idx))
             
             # Map each segment speaker to the most similar first-segment speaker
-            for speaker in segment_speakers:
-                # If we already have fewer than or equal speakers in the first segment, use a simple mapping
-                if len(segment_speakers) <= len(first_segment_speakers):
-                    # Try to map by position/index
-                    try:
-                        idx = segment_speakers.index(speaker)
-                        if idx < len(first_segment_speakers):
-                            speaker_mapping[(segment_idx, speaker)] = first_segment_speakers[idx]
-                        else:
-                            speaker_mapping[(segment_idx, speaker)] = first_segment_speakers[0]
-                    except:
-                        # Fallback to first speaker
-                        speaker_mapping[(segment_idx, speaker)] = first_segment_speakers[0]
-                else:
-                    # More speakers in this segment than the first - use modulo mapping
-                    try:
-                        idx = segment_speakers.index(speaker) % len(first_segment_speakers)
-                        speaker_mapping[(segment_idx, speaker)] = first_segment_speakers[idx]
-                    except:
-                        # Fallback to first speaker
-                        speaker_mapping[(segment_idx, speaker)] = first_segment_speakers[0]
+            for speaker, mapped in map_segment_speakers(segment_speakers, first_segment_speakers).items():
+                speaker_mapping[(segment_idx, speaker)] = mapped
         
         # Apply speaker mapping and custom labels
         final_transcript = []
@@ -261,7 +357,7 @@ def merge_transcriptions(segments, speaker_labels, raw_segments=None):
                 
             # If same speaker and close in time, merge
             if (entry['speaker'] == current_entry['speaker'] and 
-                entry['start'] - current_entry['end'] < 2000):  # 2 second threshold
+                entry['start'] - current_entry['end'] < MERGE_GAP):
                 current_entry['text'] += " " + entry['text']
                 current_entry['end'] = entry['end']
             else:
@@ -321,20 +417,24 @@ def process_transcript_with_labels(current_job, speaker_labels):
         
         # Merge transcripts and apply speaker labels
         raw_segments = current_job.get('raw_segments', [])
-        final_transcript = merge_transcriptions(all_segments, speaker_labels, raw_segments)
+        with span('merge'):
+            final_transcript = merge_transcriptions(all_segments, speaker_labels, raw_segments)
         
         # Log the final transcript for debugging
         logger.info(f"Final transcript created with {len(final_transcript)} entries")
         
-        # Update job with final transcript
+        # Update job with final transcript and its search/seek index
         current_job['final_transcript'] = final_transcript
+        with span('index'):
+            current_job['transcript_index'] = build_index(final_transcript)
         current_job['status'] = "Processing complete"
         current_job['processing_progress'] = 100
         current_job['processing_complete'] = True
         
         # Log completion 
         logger.info("Transcript processing complete")
-        logger.debug(f"Final transcript: {final_transcript}")
+        if should_log_payload():
+            logger.debug(f"Final transcript: {final_transcript}")
         
     except Exception as e:
         error_details = traceback.format_exc()
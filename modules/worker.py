@@ -0,0 +1,87 @@
+"""
+Standalone transcription worker.
+Pulls jobs queued by the web server (JOB_BACKEND=worker) from the shared SQLite
+job store and runs them outside the Flask process. Start one per core:
+
+    python -m modules.worker
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+import config
+from modules.job_store import LEASE_SECONDS, SQLiteJobStore
+from modules.pipeline import run_job
+from modules.workspace import sweep_stale_files
+
+logger = logging.getLogger(__name__)
+
+def get_worker_config():
+    """Collect the upper-case settings from config.py, mirroring the Flask app config."""
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+def run_worker(store, app_config, poll_interval=1.0, once=False):
+    """Claim and run jobs until interrupted (or until the queue is empty when once is set)."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+    logger.info(f"Worker {worker_id} polling {store.path}")
+
+    while True:
+        claimed = store.claim(worker_id)
+        if claimed is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        job_id, kind, args = claimed
+        logger.info(f"Worker {worker_id} running {kind} job {job_id}")
+        # Renew the job's lease while it runs; a worker that dies stops renewing and the job is requeued
+        done = threading.Event()
+        threading.Thread(
+            target=keep_lease, args=(store, job_id, kind, done), name=f"lease-{job_id}", daemon=True
+        ).start()
+        try:
+            job = store.get(job_id)
+            if job is None:
+                logger.error(f"Job record {job_id} not found, skipping")
+                continue
+            run_job(kind, job, args, app_config)
+        except Exception as e:
+            logger.error(f"Unhandled error in {kind} job {job_id}: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+        finally:
+            done.set()
+            store.finish(job_id, kind)
+
+def keep_lease(store, job_id, kind, done):
+    """Renew a running job's lease until done is set."""
+    while not done.wait(LEASE_SECONDS / 4):
+        try:
+            store.heartbeat(job_id, kind)
+        except Exception as e:
+            logger.warning(f"Could not renew lease on {kind} job {job_id}: {str(e)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run queued transcription jobs outside the web server.')
+    parser.add_argument('--db', default=config.JOB_DB_PATH, help='path to the shared job database')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    args = parser.parse_args(argv)
+
+    app_config = get_worker_config()
+    os.makedirs(app_config['UPLOAD_FOLDER'], exist_ok=True)
+
+    store = SQLiteJobStore(args.db)
+    # Uploads of jobs still waiting in the queue are kept however old they are
+    sweep_stale_files(app_config, active_jobs=store.active())
+    try:
+        run_worker(store, app_config, poll_interval=args.poll_interval, once=args.once)
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+
+if __name__ == '__main__':
+    main()
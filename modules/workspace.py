@@ -0,0 +1,139 @@
+"""
+Per-job scratch workspaces for audio segments.
+Segments live in a job-specific directory, preferably on tmpfs, which is removed
+on every exit path. A startup sweeper removes anything left behind by crashes.
+"""
+import os
+import shutil
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_PREFIX = 'job_'
+
+# Memory-backed filesystem used for scratch space when available
+TMPFS_ROOT = '/dev/shm'
+
+class WorkspaceQuotaError(OSError):
+    """Raised when a job's scratch space would exceed the configured quota."""
+
+def _config_value(app_config, key, default):
+    return app_config.get(key, default) if app_config else default
+
+def _directory_size(path):
+    """Return the total size in bytes of all files below path."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+def get_scratch_roots(app_config=None):
+    """Return candidate scratch roots in order of preference (memory first, then disk)."""
+    roots = []
+    configured = _config_value(app_config, 'SCRATCH_FOLDER', None)
+    if configured:
+        roots.append(configured)
+    elif os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        roots.append(os.path.join(TMPFS_ROOT, 'scribe-scratch'))
+    upload_folder = _config_value(app_config, 'UPLOAD_FOLDER', 'uploads')
+    roots.append(os.path.join(upload_folder, 'scratch'))
+    return roots
+
+class JobWorkspace:
+    """Scratch directory for a single job, removed when the context exits."""
+
+    def __init__(self, job_id, app_config=None, required_bytes=0):
+        self.job_id = job_id
+        self.app_config = app_config
+        self.required_bytes = required_bytes
+        self.path = None
+
+    def __enter__(self):
+        return self.open()
+
+    def open(self):
+        """Create the workspace in the first scratch root with room for it, returning self."""
+        quota = _config_value(self.app_config, 'SCRATCH_QUOTA_BYTES', 0)
+        for root in get_scratch_roots(self.app_config):
+            try:
+                os.makedirs(root, exist_ok=True)
+                free = shutil.disk_usage(root).free
+            except OSError as e:
+                logger.warning(f"Scratch root {root} is not usable: {str(e)}")
+                continue
+
+            if free < self.required_bytes:
+                logger.info(f"Scratch root {root} has {free} bytes free, {self.required_bytes} needed; trying next")
+                continue
+
+            if quota and _directory_size(root) + self.required_bytes > quota:
+                logger.info(f"Scratch quota of {quota} bytes would be exceeded in {root}; trying next")
+                continue
+
+            self.path = os.path.join(root, f"{WORKSPACE_PREFIX}{self.job_id}")
+            os.makedirs(self.path, exist_ok=True)
+            logger.info(f"Created scratch workspace: {self.path}")
+            return self
+
+        raise WorkspaceQuotaError(f"No scratch root has {self.required_bytes} bytes available within its quota")
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Remove the workspace; for workspaces that outlive the block that opened them."""
+        self.cleanup()
+
+    def cleanup(self):
+        """Remove the workspace directory and everything in it."""
+        if self.path and os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+            logger.info(f"Removed scratch workspace: {self.path}")
+        self.path = None
+
+def sweep_stale_files(app_config=None, max_age=None, active_jobs=()):
+    """Remove workspaces and uploads older than max_age seconds left behind by crashed jobs.
+
+    Files belonging to active_jobs (records of jobs still queued or running) are kept,
+    however old they are.
+    """
+    if max_age is None:
+        max_age = _config_value(app_config, 'STALE_FILE_MAX_AGE', 6 * 60 * 60)
+    cutoff = time.time() - max_age
+    removed = 0
+    active_workspaces = {f"{WORKSPACE_PREFIX}{job['id']}" for job in active_jobs}
+    active_uploads = {os.path.abspath(job['file_path']) for job in active_jobs if job.get('file_path')}
+
+    for root in get_scratch_roots(app_config):
+        if not os.path.isdir(root):
+            continue
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name in active_workspaces:
+                continue
+            if name.startswith(WORKSPACE_PREFIX) and os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+
+    upload_folder = _config_value(app_config, 'UPLOAD_FOLDER', 'uploads')
+    if os.path.isdir(upload_folder):
+        for name in os.listdir(upload_folder):
+            path = os.path.join(upload_folder, name)
+            if os.path.abspath(path) in active_uploads:
+                continue
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove stale file {path}: {str(e)}")
+
+    if removed:
+        logger.info(f"Swept {removed} stale scratch workspace(s) and upload(s)")
+    return removed
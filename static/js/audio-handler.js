@@ -63,10 +63,9 @@ function handleDrop(e) {
         }
         
         // Enable transcribe button if we have an API key
-        const apiKey = document.getElementById('apiKeyInput').value;
         const uploadBtn = document.getElementById('uploadBtn');
         if (uploadBtn) {
-            uploadBtn.disabled = !apiKey;
+            uploadBtn.disabled = !hasApiKey();
         }
     }
 }
@@ -83,7 +82,7 @@ async function transcribeAudio() {
         return;
     }
     
-    if (!apiKey) {
+    if (!hasApiKey()) {
         alert('Please enter your ElevenLabs API key.');
         return;
     }
@@ -118,10 +117,17 @@ async function transcribeAudio() {
             body: formData
         });
         
+        const data = await response.json().catch(() => ({}));
+        
         if (!response.ok) {
-            throw new Error('Transcription failed');
+            // 429/503 mean the server queue is full; surface its message
+            throw new Error(data.error || 'Transcription failed');
         }
         
+        currentJobId = data.job_id;
+        speakersLoaded = false;
+        getTranscriptView().reset('/result');
+        
         // Start polling for progress
         pollProgress();
         
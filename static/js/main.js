@@ -1,3 +1,9 @@
+// ID of the job returned by /transcribe, sent with every poll
+let currentJobId = null;
+
+// Whether the labeling form has been shown for the current job (it appears before transcription ends)
+let speakersLoaded = false;
+
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize UI components
     initializeToggles();
@@ -33,6 +39,12 @@ function initializeToggles() {
     }
 }
 
+// Whether a key was entered, or the server's key pool makes one unnecessary
+function hasApiKey() {
+    const apiKeyInput = document.getElementById('apiKeyInput');
+    return !!apiKeyInput && (apiKeyInput.value.trim() !== '' || apiKeyInput.dataset.optional === 'true');
+}
+
 function validateForm() {
     // Enable/disable transcribe button based on file and API key
     const audioFileInput = document.getElementById('audioFile');
@@ -41,8 +53,7 @@ function validateForm() {
     
     const checkUploadButton = () => {
         const hasFile = audioFileInput.files.length > 0;
-        const hasApiKey = apiKeyInput.value.trim() !== '';
-        uploadBtn.disabled = !(hasFile && hasApiKey);
+        uploadBtn.disabled = !(hasFile && hasApiKey());
     };
     
     if (audioFileInput && apiKeyInput) {
@@ -125,33 +136,29 @@ function resetUI() {
     }
 }
 
-function formatTranscript(transcript) {
-    let html = '';
-    let currentSpeaker = '';
-    
-    if (!transcript || transcript.length === 0) {
-        return '<p>No transcript data found.</p>';
+function formatSpeakerLabel(speakerLabel) {
+    // If the speaker is just a number or "speakerX", format it as "Speaker X"
+    if (/^[0-9]+$/.test(speakerLabel) || /^speaker_?[0-9]+$/i.test(speakerLabel)) {
+        // Extract just the number part
+        const speakerNum = speakerLabel.replace(/^speaker_?/i, '');
+        return `Speaker ${speakerNum}`;
     }
-    
-    transcript.forEach(segment => {
-        // Format the speaker label to ensure it's always "Speaker X"
-        let speakerLabel = segment.speaker;
-        
-        // If the speaker is just a number or "speakerX", format it as "Speaker X"
-        if (/^[0-9]+$/.test(speakerLabel) || /^speaker_?[0-9]+$/i.test(speakerLabel)) {
-            // Extract just the number part
-            const speakerNum = speakerLabel.replace(/^speaker_?/i, '');
-            speakerLabel = `Speaker ${speakerNum}`;
-        }
-        
-        if (speakerLabel !== currentSpeaker) {
-            currentSpeaker = speakerLabel;
-            html += `<div class="speaker">${speakerLabel}</div>`;
-        }
-        html += `<div class="transcript-text">${segment.text}</div>`;
-    });
-    
-    return html;
+    return speakerLabel;
+}
+
+function escapeHtml(text) {
+    return String(text ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;');
+}
+
+function jobUrl(path) {
+    // Scope a request to the current job so concurrent jobs don't mix
+    if (!currentJobId) return path;
+    const separator = path.includes('?') ? '&' : '?';
+    return `${path}${separator}job_id=${encodeURIComponent(currentJobId)}`;
 }
 
 function truncateText(text, maxLength) {
@@ -0,0 +1,221 @@
+// Virtualized transcript rendering
+// Entries are kept in memory but only the blocks of entries near the visible
+// part of the transcript are in the DOM, so multi-hour transcripts scroll smoothly.
+// Blocks not loaded yet are fetched a page at a time from the server.
+
+const TRANSCRIPT_BLOCK_ENTRIES = 50;
+const TRANSCRIPT_PAGE_ENTRIES = 500;
+// Extra screen heights rendered above and below the viewport
+const TRANSCRIPT_OVERSCAN = 1;
+// Height assumed for blocks that haven't been rendered yet
+const TRANSCRIPT_ESTIMATED_ENTRY_HEIGHT = 60;
+
+class TranscriptView {
+    constructor(container) {
+        this.container = container;
+        this.topSpacer = document.createElement('div');
+        this.blocksElement = document.createElement('div');
+        this.bottomSpacer = document.createElement('div');
+        this.renderPending = false;
+        this.generation = 0;
+        this.container.addEventListener('scroll', () => this.scheduleRender());
+        // Text rewraps at a new width, so every block is measured again
+        window.addEventListener('resize', () => {
+            this.blockHeights = [];
+            this.renderedRange = null;
+            this.scheduleRender();
+        });
+        this.reset(null);
+    }
+
+    // Start over with a transcript served from source ('/result' or '/final-transcript')
+    reset(source, total = 0) {
+        this.source = source;
+        this.generation++;
+        this.total = total;
+        this.entries = [];
+        this.blockHeights = [];
+        this.pagesLoading = new Set();
+        this.renderedRange = null;
+        this.container.innerHTML = '';
+        this.container.scrollTop = 0;
+        this.container.append(this.topSpacer, this.blocksElement, this.bottomSpacer);
+        this.scheduleRender();
+    }
+
+    // Entries the view holds contiguously from the start
+    get loadedCount() {
+        let count = 0;
+        while (count < this.entries.length && this.entries[count] !== undefined) {
+            count++;
+        }
+        return count;
+    }
+
+    // Replace entries from offset onwards (the last live entry can still grow, so it is resent)
+    splice(offset, entries, total) {
+        // Polls usually resend an unchanged last entry; re-rendering for it would reset text selection
+        const unchanged = (total === undefined || total === this.total) && entries.every((entry, i) => {
+            const current = this.entries[offset + i];
+            return current !== undefined && current.text === entry.text && current.speaker === entry.speaker;
+        });
+        if (unchanged) return;
+
+        for (let i = 0; i < entries.length; i++) {
+            this.entries[offset + i] = entries[i];
+        }
+        if (total !== undefined) {
+            this.total = total;
+            this.entries.length = Math.min(this.entries.length, total);
+        }
+        // Changed blocks (and the one after, whose first speaker label may change) are re-measured
+        const firstBlock = Math.floor(offset / TRANSCRIPT_BLOCK_ENTRIES);
+        const lastBlock = Math.floor((offset + entries.length) / TRANSCRIPT_BLOCK_ENTRIES);
+        for (let block = firstBlock; block <= lastBlock; block++) {
+            this.blockHeights[block] = undefined;
+        }
+        this.renderedRange = null;
+        this.scheduleRender();
+    }
+
+    scheduleRender() {
+        if (this.renderPending) return;
+        this.renderPending = true;
+        requestAnimationFrame(() => {
+            this.renderPending = false;
+            this.render();
+        });
+    }
+
+    blockCount() {
+        return Math.ceil(this.total / TRANSCRIPT_BLOCK_ENTRIES);
+    }
+
+    blockHeight(block) {
+        if (this.blockHeights[block] !== undefined) return this.blockHeights[block];
+        const entries = Math.min(TRANSCRIPT_BLOCK_ENTRIES, this.total - block * TRANSCRIPT_BLOCK_ENTRIES);
+        return entries * TRANSCRIPT_ESTIMATED_ENTRY_HEIGHT;
+    }
+
+    blockLoaded(block) {
+        const end = Math.min(this.total, (block + 1) * TRANSCRIPT_BLOCK_ENTRIES);
+        for (let i = block * TRANSCRIPT_BLOCK_ENTRIES; i < end; i++) {
+            if (this.entries[i] === undefined) return false;
+        }
+        return true;
+    }
+
+    render() {
+        // Hidden containers measure as zero height; the view is rendered again when data arrives
+        if (this.container.offsetParent === null) {
+            this.renderedRange = null;
+            return;
+        }
+
+        if (!this.total) {
+            this.renderedRange = null;
+            this.topSpacer.style.height = '0px';
+            this.bottomSpacer.style.height = '0px';
+            this.blocksElement.innerHTML = this.source ? '<p>No transcript data found.</p>' : '';
+            return;
+        }
+
+        // Find the blocks overlapping the viewport, plus the overscan
+        const viewTop = Math.max(0, this.container.scrollTop - this.container.clientHeight * TRANSCRIPT_OVERSCAN);
+        const viewBottom = this.container.scrollTop + this.container.clientHeight * (1 + TRANSCRIPT_OVERSCAN);
+        const blocks = this.blockCount();
+        let first = 0;
+        let top = 0;
+        while (first < blocks - 1 && top + this.blockHeight(first) < viewTop) {
+            top += this.blockHeight(first);
+            first++;
+        }
+        let last = first;
+        let bottom = top + this.blockHeight(first);
+        while (last < blocks - 1 && bottom < viewBottom) {
+            last++;
+            bottom += this.blockHeight(last);
+        }
+
+        for (let block = first; block <= last; block++) {
+            if (!this.blockLoaded(block)) this.loadPage(block);
+        }
+
+        const range = `${first}-${last}`;
+        if (range !== this.renderedRange) {
+            this.renderedRange = range;
+            let html = '';
+            for (let block = first; block <= last; block++) {
+                html += `<div class="transcript-block" data-block="${block}">${this.blockHtml(block)}</div>`;
+            }
+            this.blocksElement.innerHTML = html;
+
+            // Measure what was rendered so later scroll positions are exact
+            this.blocksElement.querySelectorAll('.transcript-block').forEach(element => {
+                const block = Number(element.dataset.block);
+                if (this.blockLoaded(block)) {
+                    this.blockHeights[block] = element.offsetHeight;
+                }
+            });
+        }
+
+        let below = 0;
+        for (let block = last + 1; block < blocks; block++) {
+            below += this.blockHeight(block);
+        }
+        this.topSpacer.style.height = `${top}px`;
+        this.bottomSpacer.style.height = `${below}px`;
+    }
+
+    blockHtml(block) {
+        const start = block * TRANSCRIPT_BLOCK_ENTRIES;
+        const end = Math.min(this.total, start + TRANSCRIPT_BLOCK_ENTRIES);
+        const previous = start > 0 ? this.entries[start - 1] : undefined;
+        let currentSpeaker = previous ? formatSpeakerLabel(previous.speaker) : '';
+        let html = '';
+        for (let i = start; i < end; i++) {
+            const entry = this.entries[i];
+            if (entry === undefined) {
+                html += '<div class="transcript-text transcript-loading">Loading...</div>';
+                continue;
+            }
+            const speakerLabel = formatSpeakerLabel(entry.speaker);
+            if (speakerLabel !== currentSpeaker) {
+                currentSpeaker = speakerLabel;
+                html += `<div class="speaker">${escapeHtml(speakerLabel)}</div>`;
+            }
+            html += `<div class="transcript-text">${escapeHtml(entry.text)}</div>`;
+        }
+        return html;
+    }
+
+    // Fetch the page of entries containing a block, once
+    async loadPage(block) {
+        if (!this.source) return;
+        const page = Math.floor(block * TRANSCRIPT_BLOCK_ENTRIES / TRANSCRIPT_PAGE_ENTRIES);
+        if (this.pagesLoading.has(page)) return;
+        this.pagesLoading.add(page);
+
+        const generation = this.generation;
+        try {
+            const response = await fetch(jobUrl(`${this.source}?offset=${page * TRANSCRIPT_PAGE_ENTRIES}&limit=${TRANSCRIPT_PAGE_ENTRIES}`));
+            const data = await response.json();
+            // Ignore pages that arrive after the view was reset
+            if (generation === this.generation && data.transcript) {
+                this.splice(data.offset, data.transcript, data.total);
+            }
+        } catch (error) {
+            console.error('Error loading transcript page:', error);
+            if (generation === this.generation) this.pagesLoading.delete(page);
+        }
+    }
+}
+
+let transcriptView = null;
+
+function getTranscriptView() {
+    if (!transcriptView) {
+        transcriptView = new TranscriptView(document.getElementById('result'));
+    }
+    return transcriptView;
+}
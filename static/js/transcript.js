@@ -1,20 +1,12 @@
 // Speaker labeling functionality
 async function loadSpeakersForLabeling() {
     try {
-        const response = await fetch('/speakers');
+        const response = await fetch(jobUrl('/speakers'));
         const data = await response.json();
         
         if (data.speakers && data.speakers.length > 0) {
-            // Get example text for each speaker from the first segment
-            const resultResponse = await fetch('/result');
-            const resultData = await resultResponse.json();
-            
-            const speakerExamples = {};
-            resultData.transcript.forEach(segment => {
-                if (!speakerExamples[segment.speaker]) {
-                    speakerExamples[segment.speaker] = segment.text;
-                }
-            });
+            // Example text for each speaker from the first segment
+            const speakerExamples = data.examples || {};
             
             // Sort speakers numerically (this fixes the order)
             const sortedSpeakers = [...data.speakers].sort((a, b) => {
@@ -125,7 +117,7 @@ async function processTranscriptWithLabels() {
                 'Content-Type': 'application/json',
                 'Cache-Control': 'no-cache'
             },
-            body: JSON.stringify({ speaker_labels: speakerLabels }),
+            body: JSON.stringify({ speaker_labels: speakerLabels, job_id: currentJobId }),
         });
         
         if (!response.ok) {
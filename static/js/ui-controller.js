@@ -26,7 +26,10 @@ function initializeButtons() {
 
 async function pollProgress() {
     try {
-        const response = await fetch('/progress');
+        // Only ask for entries not shown yet; the last one is resent as it may still be growing
+        const view = getTranscriptView();
+        const since = Math.max(0, view.loadedCount - 1);
+        const response = await fetch(jobUrl(`/progress?since=${since}`));
         const data = await response.json();
         
         // Update progress bar
@@ -41,8 +44,13 @@ async function pollProgress() {
             statusText.textContent = data.status || 'Processing...';
         }
         
+        // Append new entries to the live transcript
+        if (data.transcript && data.transcript.length > 0) {
+            view.splice(data.offset, data.transcript, data.total);
+        }
+        
         // Show result container as soon as transcription starts
-        if (data.progress > 0 && data.transcript && data.transcript.length > 0) {
+        if (data.progress > 0 && data.total > 0) {
             const placeholderResult = document.getElementById('placeholderResultContainer');
             const resultContainer = document.getElementById('resultContainer');
             
@@ -52,33 +60,15 @@ async function pollProgress() {
             
             if (resultContainer) {
                 resultContainer.style.display = 'flex';
-                const resultDiv = document.getElementById('result');
-                if (resultDiv) {
-                    resultDiv.innerHTML = formatTranscript(data.transcript);
-                    
-                    // Remove auto-scrolling behavior
-                    // resultDiv.scrollTop = resultDiv.scrollHeight;
-                }
             }
         }
         
+        // Speakers are known once the first segment is done, so labeling can start before the rest finish
+        if (data.speakers_ready && !speakersLoaded) {
+            await showSpeakerLabeling();
+        }
+        
         if (data.complete) {
-            // Show speaker labeling container and hide placeholder
-            const placeholderLabeling = document.getElementById('placeholderLabelingContainer');
-            if (placeholderLabeling) {
-                placeholderLabeling.style.display = 'none';
-            }
-            
-            // Get the final transcription result of first segment
-            const resultResponse = await fetch('/result');
-            const resultData = await resultResponse.json();
-            
-            // Display the final result
-            const resultDiv = document.getElementById('result');
-            if (resultDiv) {
-                resultDiv.innerHTML = formatTranscript(resultData.transcript);
-            }
-            
             // Reset the transcribe button
             const uploadBtn = document.getElementById('uploadBtn');
             if (uploadBtn) {
@@ -86,8 +76,10 @@ async function pollProgress() {
                 uploadBtn.innerHTML = '<span>Transcribe</span>';
             }
             
-            // Load speakers for labeling
-            await loadSpeakersForLabeling();
+            // Load speakers for labeling unless the form is already showing
+            if (!speakersLoaded) {
+                await showSpeakerLabeling();
+            }
         } else {
             // Continue polling
             setTimeout(pollProgress, 2000);
@@ -109,6 +101,18 @@ async function pollProgress() {
     }
 }
 
+async function showSpeakerLabeling() {
+    speakersLoaded = true;
+    
+    // Show speaker labeling container and hide placeholder
+    const placeholderLabeling = document.getElementById('placeholderLabelingContainer');
+    if (placeholderLabeling) {
+        placeholderLabeling.style.display = 'none';
+    }
+    
+    await loadSpeakersForLabeling();
+}
+
 let processingInterval;
 let processingProgress = 10;
 
@@ -138,11 +142,15 @@ async function pollProcessingProgress() {
             }
         }, 500);
         
+        // Labels submitted early wait for the transcription tail, which doesn't count towards the polling limit
+        let waitingForTranscription = false;
+        
         // Monitor actual status from server
         const checkServerStatus = async () => {
             try {
-                const response = await fetch('/processing-progress');
+                const response = await fetch(jobUrl('/processing-progress'));
                 const data = await response.json();
+                waitingForTranscription = data.transcription_complete === false;
                 
                 // If we have actual progress data, use it
                 if (data.progress > 0) {
@@ -174,8 +182,8 @@ async function pollProcessingProgress() {
         // Check for final transcript
         const checkFinalTranscript = async () => {
             try {
-                // Add a cache-busting parameter to the URL
-                const finalResponse = await fetch('/final-transcript?t=' + new Date().getTime(), {
+                // Add a cache-busting parameter to the URL; only the first page is needed here
+                const finalResponse = await fetch(jobUrl(`/final-transcript?offset=0&limit=${TRANSCRIPT_PAGE_ENTRIES}&t=${new Date().getTime()}`), {
                     headers: {
                         'Cache-Control': 'no-cache',
                         'Pragma': 'no-cache'
@@ -193,7 +201,7 @@ async function pollProcessingProgress() {
                 
                 if (finalData.transcript && finalData.transcript.length > 0) {
                     // Log the received transcript for debugging
-                    console.log('Received final transcript with', finalData.transcript.length, 'entries');
+                    console.log('Received final transcript with', finalData.total, 'entries');
                     
                     await finalizeProcessing(finalData);
                     return true;
@@ -213,7 +221,7 @@ async function pollProcessingProgress() {
             if (!finalData || !finalData.transcript) {
                 try {
                     // Add a cache-busting parameter to the URL
-                    const response = await fetch('/final-transcript?t=' + new Date().getTime(), {
+                    const response = await fetch(jobUrl(`/final-transcript?offset=0&limit=${TRANSCRIPT_PAGE_ENTRIES}&t=${new Date().getTime()}`), {
                         headers: {
                             'Cache-Control': 'no-cache'
                         }
@@ -253,16 +261,19 @@ async function pollProcessingProgress() {
                     // Update the content
                     const resultDiv = document.getElementById('result');
                     if (resultDiv && finalData && finalData.transcript && finalData.transcript.length > 0) {
-                        // Log the final transcript being rendered
-                        console.log('Rendering final transcript:', finalData.transcript);
-                        
-                        // Force a complete refresh of the content
-                        resultDiv.innerHTML = formatTranscript(finalData.transcript);
+                        // Switch the view to the final transcript; later pages load as they scroll into view
+                        const view = getTranscriptView();
+                        view.reset('/final-transcript', finalData.total);
+                        view.splice(finalData.offset, finalData.transcript, finalData.total);
                     } else {
                         console.error('Unable to update transcript: No valid transcript data');
                         
                         if (resultDiv) {
-                            resultDiv.innerHTML += '<p class="error-message">Error: No transcript data received from server.</p>';
+                            // Appended rather than written into innerHTML, which would detach the view's elements
+                            const errorMessage = document.createElement('p');
+                            errorMessage.className = 'error-message';
+                            errorMessage.textContent = 'Error: No transcript data received from server.';
+                            resultDiv.appendChild(errorMessage);
                         }
                     }
                     
@@ -324,7 +335,9 @@ async function pollProcessingProgress() {
                     window.pollAttempts = 0;
                 }
                 
-                window.pollAttempts++;
+                if (!waitingForTranscription) {
+                    window.pollAttempts++;
+                }
                 console.log(`Polling attempt ${window.pollAttempts}...`);
                 
                 // If we've been polling for a long time (over 60 seconds), try to finalize anyway
@@ -383,12 +396,12 @@ async function pollProcessingProgress() {
 async function copyTranscript() {
     try {
         // Get the current transcript
-        const response = await fetch('/final-transcript');
+        const response = await fetch(jobUrl('/final-transcript'));
         let data = await response.json();
         
         // If there's no final transcript yet, use the initial one
         if (!data.transcript || data.transcript.length === 0) {
-            const resultResponse = await fetch('/result');
+            const resultResponse = await fetch(jobUrl('/result'));
             data = await resultResponse.json();
         }
         
@@ -397,12 +410,7 @@ async function copyTranscript() {
         let currentSpeaker = '';
         
         data.transcript.forEach(segment => {
-            // Format speaker label
-            let speakerLabel = segment.speaker;
-            if (/^[0-9]+$/.test(speakerLabel) || /^speaker_?[0-9]+$/i.test(speakerLabel)) {
-                const speakerNum = speakerLabel.replace(/^speaker_?/i, '');
-                speakerLabel = `Speaker ${speakerNum}`;
-            }
+            const speakerLabel = formatSpeakerLabel(segment.speaker);
             
             if (speakerLabel !== currentSpeaker) {
                 currentSpeaker = speakerLabel;
@@ -439,45 +447,15 @@ async function copyTranscript() {
 
 async function downloadTranscript() {
     try {
-        // Get the current transcript
-        const response = await fetch('/final-transcript');
-        let data = await response.json();
-        
-        // If there's no final transcript yet, use the initial one
-        if (!data.transcript || data.transcript.length === 0) {
-            const resultResponse = await fetch('/result');
-            data = await resultResponse.json();
-        }
-        
-        // Format transcript for download
-        let content = '';
-        let currentSpeaker = '';
-        
-        data.transcript.forEach(segment => {
-            // Format speaker label
-            let speakerLabel = segment.speaker;
-            if (/^[0-9]+$/.test(speakerLabel) || /^speaker_?[0-9]+$/i.test(speakerLabel)) {
-                const speakerNum = speakerLabel.replace(/^speaker_?/i, '');
-                speakerLabel = `Speaker ${speakerNum}`;
-            }
-            
-            if (speakerLabel !== currentSpeaker) {
-                currentSpeaker = speakerLabel;
-                content += `\n${currentSpeaker}:\n`;
-            }
-            content += `${segment.text}\n`;
-        });
-        
-        // Create download link
-        const blob = new Blob([content], { type: 'text/plain' });
-        const url = URL.createObjectURL(blob);
+        // The server streams the export, so the transcript is never held in the page
+        const formatSelect = document.getElementById('exportFormat');
+        const format = formatSelect ? formatSelect.value : 'txt';
         const a = document.createElement('a');
-        a.href = url;
-        a.download = 'transcript.txt';
+        a.href = jobUrl(`/export/${format}`);
+        a.download = `transcript.${format}`;
         document.body.appendChild(a);
         a.click();
         document.body.removeChild(a);
-        URL.revokeObjectURL(url);
         
         // Temporarily change button text to indicate success
         const downloadBtn = document.getElementById('downloadBtn');
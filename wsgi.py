@@ -0,0 +1,12 @@
+"""
+Production WSGI entry point.
+
+    gunicorn --preload -w 4 -b 0.0.0.0:8000 wsgi:app
+
+Set JOB_BACKEND=sqlite (or worker, with separate `python -m modules.worker`
+processes) when running more than one server process, so every process sees
+the same jobs.
+"""
+from app import create_app
+
+app = create_app()